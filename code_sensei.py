@@ -3,15 +3,46 @@ Code-Sensei: DSA Logic and Time Complexity Analyzer
 Powered by Gemini AI for Advanced Code Analysis
 """
 
-import click
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Optional
+
+import click
 from colorama import init, Fore, Style
 from gemini_analyzer import (
+    errors_silenced_by,
     is_gemini_available,
     analyze_complexity_with_gemini,
     detect_patterns_with_gemini,
     get_optimization_suggestions,
-    explain_algorithm
+    explain_algorithm,
+    save_latencies
+)
+from fingerprint_index import (
+    INDEX_PATH,
+    FingerprintIndex,
+    add_vetted_results,
+    build_canonical_index,
+    function_source
+)
+from hotspot_profiler import (
+    describe_hotspots,
+    growth_label,
+    summarize_profile,
+    top_hotspots
+)
+from sandbox_runner import measure
+from scan_pipeline import scan_tree
+from result_store import (
+    COMPLEXITY_CLASSES,
+    CONFIDENCE_LEVELS,
+    complexity_rank,
+    store_results,
+    latest_function_result,
+    query_functions,
+    query_patterns
 )
 
 # Initialize colorama for cross-platform colored output
@@ -32,7 +63,10 @@ def print_gemini_complexity_results(results):
     if not results or 'functions' not in results:
         return
     
-    print(f"{Fore.GREEN}🤖 GEMINI AI COMPLEXITY ANALYSIS{Style.RESET_ALL}")
+    if results.get('source') == 'local':
+        print(f"{Fore.GREEN}🔍 LOCAL COMPLEXITY ANALYSIS{Style.RESET_ALL}")
+    else:
+        print(f"{Fore.GREEN}🤖 GEMINI AI COMPLEXITY ANALYSIS{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
     
     for func in results['functions']:
@@ -65,7 +99,10 @@ def print_gemini_pattern_results(results):
     if not results or 'patterns' not in results:
         return
     
-    print(f"{Fore.GREEN}🤖 GEMINI AI PATTERN DETECTION{Style.RESET_ALL}")
+    if results.get('source') == 'local':
+        print(f"{Fore.GREEN}🔍 LOCAL PATTERN DETECTION{Style.RESET_ALL}")
+    else:
+        print(f"{Fore.GREEN}🤖 GEMINI AI PATTERN DETECTION{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
     
     # Algorithm type
@@ -104,8 +141,47 @@ def print_gemini_pattern_results(results):
         print()
 
 
-def analyze_file(filepath: str, detailed: bool = False):
-    """Analyze a code file using Gemini AI"""
+def print_hotspot_profile(profile):
+    """Print line hit counts annotated with their growth exponents"""
+    print(f"{Fore.GREEN}🔥 LINE HOTSPOTS: {profile['function']}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
+    sizes = profile['sizes']
+    print(f"{Fore.CYAN}Input sizes: {', '.join(str(n) for n in sizes)}{Style.RESET_ALL}")
+    if profile['stopped_at']:
+        print(f"{Fore.YELLOW}⚠️  Stopped at n={profile['stopped_at']}: trial exceeded the budget{Style.RESET_ALL}")
+    print()
+    
+    hottest = {entry['line'] for entry in top_hotspots(profile)}
+    entries = {entry['line']: entry for entry in profile['lines']}
+    for index, section in enumerate(profile['sections']):
+        # Helpers the function called are shown after it
+        if index:
+            print(f"{Fore.CYAN}       called: {section['function']}{Style.RESET_ALL}")
+        for offset, source in enumerate(section['source_lines']):
+            number = section['first_line'] + offset
+            entry = entries.get(number)
+            if entry is None:
+                print(f"{Fore.WHITE}{number:>5}  {'':>18}  {source}{Style.RESET_ALL}")
+                continue
+            color = Fore.RED + Style.BRIGHT if number in hottest else Fore.WHITE
+            annotation = f"{growth_label(entry):<7} {entry['hits'][-1]:>10,}"
+            print(f"{color}{number:>5}  {annotation:>18}  {source}{Style.RESET_ALL}")
+        print()
+
+
+def analyze_file(filepath: str, detailed: bool = False, deadline: Optional[float] = None,
+                 timeout: Optional[float] = None, store: bool = True):
+    """
+    Analyze a code file using Gemini AI
+
+    Args:
+        filepath: Path of the file to analyze
+        detailed: Also request an algorithm explanation
+        deadline: Seconds after which completed stages are rendered and the
+            rest are reported as pending
+        timeout: Seconds allowed for each individual model call
+        store: Persist the results in the local result store
+    """
     path = Path(filepath)
     
     if not path.exists():
@@ -135,39 +211,101 @@ def analyze_file(filepath: str, detailed: bool = False):
     
     print(f"{Fore.MAGENTA}✨ Analyzing with Gemini AI...{Style.RESET_ALL}\n")
     
+    # Run the independent stages concurrently so a deadline can cut them off
+    stages = [
+        ('complexity', 'Complexity analysis', analyze_complexity_with_gemini),
+        ('patterns', 'Pattern detection', detect_patterns_with_gemini),
+    ]
+    if detailed:
+        stages.append(('explanation', 'Algorithm explanation', explain_algorithm))
+    stages.append(('optimizations', 'Optimization suggestions', get_optimization_suggestions))
+    
+    started = time.monotonic()
+    call_timeout = min((limit for limit in (timeout, deadline) if limit is not None), default=None)
+    abandoned = threading.Event()
+    
+    finished_at = {}
+    
+    def run_stage(key, func):
+        with errors_silenced_by(abandoned):
+            try:
+                return func(code, call_timeout)
+            finally:
+                finished_at[key] = time.monotonic() - started
+    
+    executor = ThreadPoolExecutor(max_workers=len(stages))
+    futures = {key: executor.submit(run_stage, key, func) for key, _, func in stages}
+    wait(futures.values(), timeout=deadline)
+    # Stages still running are abandoned; they must not print over the results
+    abandoned.set()
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    # Stages still running at the deadline, or whose model call gave up when it
+    # arrived, are pending; a stage that failed before the deadline is reported
+    # as a failure
+    results = {key: future.result() for key, future in futures.items()
+               if future.done() and (future.result() is not None or deadline is None
+                                     or finished_at[key] < deadline)}
+    pending = [label for key, label, _ in stages if key not in results]
+    
     # Gemini complexity analysis
-    gemini_complexity = analyze_complexity_with_gemini(code)
-    if gemini_complexity:
-        print_gemini_complexity_results(gemini_complexity)
-    else:
-        print(f"{Fore.YELLOW}⚠️  Could not analyze complexity{Style.RESET_ALL}\n")
+    if 'complexity' in results:
+        if results['complexity']:
+            print_gemini_complexity_results(results['complexity'])
+        else:
+            print(f"{Fore.YELLOW}⚠️  Could not analyze complexity{Style.RESET_ALL}\n")
     
     # Gemini pattern detection
-    gemini_patterns = detect_patterns_with_gemini(code)
-    if gemini_patterns:
-        print_gemini_pattern_results(gemini_patterns)
-    else:
-        print(f"{Fore.YELLOW}⚠️  Could not detect patterns{Style.RESET_ALL}\n")
+    if 'patterns' in results:
+        if results['patterns']:
+            print_gemini_pattern_results(results['patterns'])
+        else:
+            print(f"{Fore.YELLOW}⚠️  Could not detect patterns{Style.RESET_ALL}\n")
     
     # Algorithm explanation
-    if detailed:
-        explanation = explain_algorithm(code)
+    if 'explanation' in results:
+        explanation = results['explanation']
         if explanation:
             print(f"{Fore.GREEN}📖 ALGORITHM EXPLANATION{Style.RESET_ALL}")
             print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
             print(f"{Fore.WHITE}{explanation}{Style.RESET_ALL}\n")
+        else:
+            print(f"{Fore.YELLOW}⚠️  Could not explain the algorithm{Style.RESET_ALL}\n")
     
     # Optimization suggestions
-    optimizations = get_optimization_suggestions(code)
-    if optimizations:
-        print(f"{Fore.GREEN}💡 OPTIMIZATION SUGGESTIONS{Style.RESET_ALL}")
-        print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
-        for i, suggestion in enumerate(optimizations, 1):
-            print(f"{Fore.YELLOW}{i}. {suggestion}{Style.RESET_ALL}\n")
+    if 'optimizations' in results:
+        optimizations = results['optimizations']
+        if optimizations:
+            print(f"{Fore.GREEN}💡 OPTIMIZATION SUGGESTIONS{Style.RESET_ALL}")
+            print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
+            for i, suggestion in enumerate(optimizations, 1):
+                print(f"{Fore.YELLOW}{i}. {suggestion}{Style.RESET_ALL}\n")
+        elif optimizations is None:
+            print(f"{Fore.YELLOW}⚠️  Could not get optimization suggestions{Style.RESET_ALL}\n")
+    
+    # Persist results so they can be queried later
+    if store and (results.get('complexity') or results.get('patterns')):
+        try:
+            store_results(filepath, code, results.get('complexity'), results.get('patterns'))
+        except Exception as e:
+            print(f"{Fore.YELLOW}⚠️  Could not save results: {e}{Style.RESET_ALL}\n")
+    
+    # Stages cut off by the deadline
+    if pending:
+        elapsed = time.monotonic() - started
+        print(f"{Fore.YELLOW}⏳ PENDING (deadline of {deadline:.1f}s reached after {elapsed:.1f}s){Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}{'─'*60}{Style.RESET_ALL}\n")
+        for label in pending:
+            print(f"{Fore.YELLOW}  • {label}: pending{Style.RESET_ALL}")
+        print()
     
     # Summary
     print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}✅ Analysis Complete!{Style.RESET_ALL}\n")
+    
+    # Latencies seed the hedging delay of later runs
+    if store:
+        save_latencies()
 
 
 @click.group()
@@ -179,9 +317,235 @@ def cli():
 @cli.command()
 @click.argument('filepath', type=click.Path())
 @click.option('--detailed', '-d', is_flag=True, help='Show detailed analysis')
-def analyze(filepath, detailed):
+@click.option('--deadline', type=click.FloatRange(min=0, min_open=True), default=None,
+              help='Seconds to wait before rendering partial results')
+@click.option('--timeout', type=click.FloatRange(min=0, min_open=True), default=None,
+              help='Seconds allowed for each model call')
+@click.option('--no-store', is_flag=True, help='Do not save results to the result store')
+def analyze(filepath, detailed, deadline, timeout, no_store):
     """Analyze a code file for DSA patterns and complexity"""
-    analyze_file(filepath, detailed)
+    analyze_file(filepath, detailed, deadline, timeout, not no_store)
+
+
+@cli.command()
+@click.argument('root', type=click.Path(exists=True))
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=4,
+              help='Concurrent analysis workers')
+@click.option('--queue-size', type=click.IntRange(min=1), default=None,
+              help='Capacity of each pipeline queue')
+@click.option('--timeout', type=click.FloatRange(min=0, min_open=True), default=None,
+              help='Seconds allowed for each model call')
+@click.option('--fresh', is_flag=True, help='Ignore the checkpoint and start over')
+@click.option('--no-store', is_flag=True, help='Do not save results to the result store')
+def scan(root, workers, queue_size, timeout, fresh, no_store):
+    """Analyze every Python file under a directory, resuming interrupted runs"""
+    print_header()
+    
+    # Check if Gemini is available
+    if not is_gemini_available():
+        print(f"{Fore.RED}❌ ERROR: Gemini API is not configured!{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}Please set your GEMINI_API_KEY in the .env file{Style.RESET_ALL}\n")
+        return
+    
+    print(f"{Fore.CYAN}Scanning: {Style.BRIGHT}{root}{Style.RESET_ALL}\n")
+    
+    def analyze_item(item):
+        complexity = analyze_complexity_with_gemini(item['minimized'], timeout)
+        patterns = detect_patterns_with_gemini(item['minimized'], timeout)
+        # Files with no result at all are not checkpointed, so a resumed run retries them
+        if not complexity and not patterns:
+            return None
+        return {'complexity': complexity, 'patterns': patterns}
+    
+    def emit_item(item, result):
+        if 'error' in item or not result:
+            print(f"{Fore.RED}❌ {item['path']}: {item.get('error', 'no result')}{Style.RESET_ALL}")
+            return
+        functions = (result['complexity'] or {}).get('functions', [])
+        patterns = (result['patterns'] or {}).get('patterns', [])
+        summary = ', '.join(f"{func['name']} {func['time_complexity']}" for func in functions)
+        print(f"{Fore.GREEN}✔{Style.RESET_ALL} {item['path']}")
+        if summary:
+            print(f"    ⏱️  {Fore.YELLOW}{summary}{Style.RESET_ALL}")
+        if patterns:
+            print(f"    🧩 {', '.join(pattern['pattern_name'] for pattern in patterns)}")
+        if not no_store:
+            try:
+                store_results(item['path'], item['code'], result['complexity'], result['patterns'])
+            except Exception as e:
+                print(f"{Fore.YELLOW}⚠️  Could not save results: {e}{Style.RESET_ALL}")
+    
+    try:
+        stats = scan_tree(root, analyze_item, emit_item, workers=workers,
+                          queue_size=queue_size, resume=not fresh)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}⏸️  Interrupted - rerun the same command to resume{Style.RESET_ALL}\n")
+        return
+    finally:
+        if not no_store:
+            save_latencies()
+    
+    print(f"\n{Fore.GREEN}{'─'*60}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}✅ Scan Complete! {stats['analyzed']} analyzed, "
+          f"{stats['skipped']} already done, {stats['failed']} failed{Style.RESET_ALL}\n")
+
+
+@cli.command()
+@click.option('--complexity', '-c', default=None,
+              help='Complexity class to match, e.g. "O(n^2)"')
+@click.option('--at-least', is_flag=True, help='Also match more expensive classes')
+@click.option('--pattern', '-p', default=None, help='DSA pattern name, e.g. "Sliding Window"')
+@click.option('--confidence', type=click.Choice(CONFIDENCE_LEVELS, case_sensitive=False),
+              default=None, help='Confidence of the complexity analysis')
+@click.option('--since', default=None, help='Analyzed on or after this date (YYYY-MM-DD)')
+@click.option('--until', default=None, help='Analyzed on or before this date (YYYY-MM-DD)')
+@click.option('--file', 'file_filter', default=None, help='Only paths containing this text')
+@click.option('--history', is_flag=True,
+              help='Also match earlier analyses, not just the latest per function')
+def query(complexity, at_least, pattern, confidence, since, until, file_filter, history):
+    """Query previously stored analysis results"""
+    try:
+        if pattern and not complexity and not confidence:
+            rows = query_patterns(pattern, since=since, until=until, file=file_filter,
+                                  history=history)
+            print(f"\n{Fore.CYAN}Files using {Style.BRIGHT}{pattern}{Style.RESET_ALL}"
+                  f"{Fore.CYAN} ({len(rows)}){Style.RESET_ALL}\n")
+            for row in rows:
+                print(f"  • {row['file']}  {Fore.YELLOW}{(row['confidence'] or 0)*100:.0f}%{Style.RESET_ALL}"
+                      f"  {row['analyzed_at']}")
+            print()
+            return
+        rows = query_functions(complexity, at_least, pattern, confidence, since, until, file_filter,
+                               history)
+    except ValueError as e:
+        print(f"{Fore.RED}❌ {e}{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}Known classes: {', '.join(COMPLEXITY_CLASSES)}{Style.RESET_ALL}")
+        return
+    
+    print(f"\n{Fore.CYAN}Matching functions ({len(rows)}){Style.RESET_ALL}\n")
+    for row in rows:
+        print(f"  • {Style.BRIGHT}{row['function']}{Style.RESET_ALL}  {row['file']}")
+        print(f"    ⏱️  {Fore.YELLOW}{row['time_complexity']}{Style.RESET_ALL}"
+              f"  💾 {Fore.YELLOW}{row['space_complexity']}{Style.RESET_ALL}"
+              f"  🎯 {row['confidence']}  {row['analyzed_at']}")
+    print()
+
+
+def parse_sizes(sizes: Optional[str]):
+    """Parse a comma-separated --sizes option; None selects the adaptive schedule"""
+    if not sizes:
+        return None
+    return [int(size) for size in sizes.split(',') if size.strip()]
+
+
+def run_trials(filepath: str, function: str, sizes: Optional[str], mode: str, workers: Optional[int],
+               trial_seconds: Optional[float], memory_mb: Optional[int]):
+    """Measure a function in sandboxed worker processes, printing any error"""
+    try:
+        sizes = parse_sizes(sizes)
+    except ValueError:
+        print(f"{Fore.RED}❌ --sizes must be comma-separated integers{Style.RESET_ALL}")
+        return None
+    
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            code = f.read()
+        return code, measure(code, function, str(Path(filepath).resolve()), sizes=sizes, mode=mode,
+                             workers=workers, trial_seconds=trial_seconds, memory_mb=memory_mb)
+    except KeyError:
+        print(f"{Fore.RED}❌ Function '{function}' not found in {filepath}{Style.RESET_ALL}")
+    except Exception as e:
+        print(f"{Fore.RED}❌ Measurement failed: {e}{Style.RESET_ALL}")
+    return None
+
+
+@cli.command()
+@click.argument('filepath', type=click.Path(exists=True))
+@click.option('--function', '-f', 'function', required=True, help='Function to run')
+@click.option('--sizes', default=None,
+              help='Comma-separated input sizes (default: grow n until the fit is stable)')
+@click.option('--workers', '-w', type=int, default=None, help='Concurrent trial processes')
+@click.option('--trial-seconds', type=float, default=None, help='Time limit for each trial')
+@click.option('--memory-mb', type=int, default=None, help='Memory limit for each trial')
+@click.option('--suggest', is_flag=True, help='Ask Gemini for suggestions targeting the hotspots')
+def profile(filepath, function, sizes, workers, trial_seconds, memory_mb, suggest):
+    """Run a function at growing input sizes and show which lines drive its growth"""
+    print_header()
+    measured = run_trials(filepath, function, sizes, 'lines', workers, trial_seconds, memory_mb)
+    if not measured:
+        return
+    code, trials = measured
+    if not trials['sizes']:
+        print(f"{Fore.RED}❌ No trial completed: {trials['errors']}{Style.RESET_ALL}")
+        return
+    
+    result = summarize_profile(function, code, trials['sizes'], trials['lines'],
+                               trials['stopped_at'])
+    print_hotspot_profile(result)
+    hotspots = describe_hotspots(result)
+    
+    if suggest:
+        if not is_gemini_available():
+            print(f"{Fore.RED}❌ ERROR: Gemini API is not configured!{Style.RESET_ALL}")
+            print(f"{Fore.YELLOW}Please set your GEMINI_API_KEY in the .env file{Style.RESET_ALL}\n")
+            return
+        source = '\n\n'.join('\n'.join(section['source_lines'])
+                               for section in result['sections'])
+        optimizations = get_optimization_suggestions(source, hotspots=hotspots)
+        if optimizations:
+            print(f"{Fore.GREEN}💡 OPTIMIZATION SUGGESTIONS{Style.RESET_ALL}")
+            print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
+            for i, suggestion in enumerate(optimizations, 1):
+                print(f"{Fore.YELLOW}{i}. {suggestion}{Style.RESET_ALL}\n")
+
+
+@cli.command('measure')
+@click.argument('filepath', type=click.Path(exists=True))
+@click.option('--function', '-f', 'function', required=True, help='Function to run')
+@click.option('--sizes', default=None,
+              help='Comma-separated input sizes (default: grow n until the fit is stable)')
+@click.option('--workers', '-w', type=int, default=None, help='Concurrent trial processes')
+@click.option('--trial-seconds', type=float, default=None, help='Time limit for each trial')
+@click.option('--memory-mb', type=int, default=None, help='Memory limit for each trial')
+@click.option('--wall-clock', is_flag=True,
+              help='Fit wall-clock time instead of executed line counts')
+def measure_command(filepath, function, sizes, workers, trial_seconds, memory_mb, wall_clock):
+    """Empirically measure a function's growth in sandboxed worker processes"""
+    print_header()
+    mode = 'time' if wall_clock else 'lines'
+    measured = run_trials(filepath, function, sizes, mode, workers, trial_seconds, memory_mb)
+    if not measured:
+        return
+    _, trials = measured
+    
+    print(f"{Fore.GREEN}📏 EMPIRICAL GROWTH: {function}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{'─'*60}{Style.RESET_ALL}\n")
+    header = 'Time per call' if mode == 'time' else 'Lines run'
+    print(f"{Fore.CYAN}{'n':>8}  {header:>14}{Style.RESET_ALL}")
+    for i, n in enumerate(trials['sizes']):
+        value = (f"{trials['seconds'][i] * 1000:.3f} ms" if mode == 'time'
+                 else f"{sum(trials['lines'][i].values()):,}")
+        print(f"{Fore.WHITE}{n:>8}  {value:>14}{Style.RESET_ALL}")
+    print()
+    for n, error in sorted(trials['errors'].items()):
+        print(f"{Fore.YELLOW}⚠️  n={n}: {error}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Stopped: {trials['reason']}{Style.RESET_ALL}")
+    
+    if not trials['complexity']:
+        print(f"{Fore.YELLOW}⚠️  Too few completed trials to fit a growth rate{Style.RESET_ALL}\n")
+        return
+    print(f"{Fore.CYAN}Fitted exponent: {Style.BRIGHT}{trials['exponent']:.2f}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Empirical complexity: {Style.BRIGHT}{trials['complexity']}{Style.RESET_ALL}")
+    
+    # Check the measurement against the last stored analysis of this function
+    stored = latest_function_result(filepath, function)
+    if stored and stored.get('time_complexity'):
+        claimed = stored['time_complexity']
+        if complexity_rank(claimed) == COMPLEXITY_CLASSES.index(trials['complexity']):
+            print(f"{Fore.GREEN}✅ Matches the stored analysis ({claimed}){Style.RESET_ALL}")
+        else:
+            print(f"{Fore.YELLOW}⚠️  Stored analysis says {claimed}{Style.RESET_ALL}")
+    print()
 
 
 @cli.command()
@@ -315,5 +679,58 @@ def fibonacci(n):
     print(f"{Fore.GREEN}✅ Demo Complete!{Style.RESET_ALL}\n")
 
 
+@cli.group()
+def index():
+    """Manage the index of vetted algorithm fingerprints"""
+    pass
+
+
+@index.command('build')
+@click.option('--from-store', is_flag=True, help='Also import vetted results from the result store')
+@click.option('--min-confidence', type=click.Choice(['high', 'medium']), default='high',
+              help='Lowest confidence of stored results to import')
+def index_build(from_store, min_confidence):
+    """Rebuild the index from the bundled canonical implementations"""
+    fingerprints = build_canonical_index()
+    print(f"{Fore.CYAN}Indexed {len(fingerprints.entries)} canonical implementations{Style.RESET_ALL}")
+    if from_store:
+        added = add_vetted_results(fingerprints, min_confidence)
+        print(f"{Fore.CYAN}Imported {added} vetted results from the result store{Style.RESET_ALL}")
+    fingerprints.save()
+    print(f"{Fore.GREEN}✅ Index written to {INDEX_PATH}{Style.RESET_ALL}\n")
+
+
+@index.command('add')
+@click.argument('filepath', type=click.Path(exists=True))
+@click.argument('function')
+@click.option('--time', 'time_complexity', default=None, help='Vetted time complexity')
+@click.option('--space', 'space_complexity', default=None, help='Vetted space complexity')
+@click.option('--pattern', 'patterns', multiple=True, help='Vetted pattern name (repeatable)')
+def index_add(filepath, function, time_complexity, space_complexity, patterns):
+    """Add one function to the index, using stored results unless labels are given"""
+    source = function_source(filepath, function)
+    if not source:
+        print(f"{Fore.RED}❌ Function '{function}' not found in {filepath}{Style.RESET_ALL}")
+        return
+    
+    labels = latest_function_result(filepath, function) or {}
+    labels = {key: labels.get(key) for key in ('time_complexity', 'space_complexity', 'best_case',
+                                               'average_case', 'worst_case', 'reasoning')}
+    labels['time_complexity'] = time_complexity or labels['time_complexity']
+    labels['space_complexity'] = space_complexity or labels['space_complexity']
+    if not labels['time_complexity'] or not labels['space_complexity']:
+        print(f"{Fore.RED}❌ No stored result for '{function}'; pass --time and --space{Style.RESET_ALL}")
+        return
+    labels['name'] = f"{Path(filepath).stem}.{function}"
+    labels['patterns'] = list(patterns)
+    
+    fingerprints = (FingerprintIndex.load() if Path(INDEX_PATH).exists()
+                    else build_canonical_index())
+    fingerprints.add(source, labels)
+    fingerprints.save()
+    print(f"{Fore.GREEN}✅ Added {labels['name']} ({labels['time_complexity']}) "
+          f"to {INDEX_PATH}{Style.RESET_ALL}\n")
+
+
 if __name__ == '__main__':
     cli()
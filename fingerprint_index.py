@@ -0,0 +1,739 @@
+"""
+Canonical Algorithm Fingerprint Index
+Answers near-duplicates of well-known solutions locally by matching MinHash
+signatures of AST shingles against a vetted index, with LSH for fast lookup
+"""
+
+import ast
+import builtins
+import hashlib
+import json
+import os
+import random
+import textwrap
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pattern_matcher import detect_data_structures, top_level_functions
+from result_store import code_fingerprint, connect
+
+INDEX_PATH = os.getenv('CODE_SENSEI_INDEX', '.code_sensei_index.json')
+SIMILARITY_THRESHOLD = float(os.getenv('CODE_SENSEI_SIMILARITY_THRESHOLD', '0.8'))
+
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# Bump when _tokens or _shape changes so saved indexes are re-signed on load
+TOKENIZER_VERSION = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+_BUILTINS = set(dir(builtins))
+
+# Vetted labels for well-known implementations
+CANONICAL_ALGORITHMS = [
+    {
+        'name': 'binary_search',
+        'time_complexity': 'O(log n)', 'space_complexity': 'O(1)',
+        'best_case': 'O(1)', 'average_case': 'O(log n)', 'worst_case': 'O(log n)',
+        'patterns': ['Binary Search'], 'algorithm_type': 'Divide and Conquer',
+        'reasoning': ['The search range is halved on every iteration',
+                      'Only a constant number of indices is stored'],
+        'source': '''
+            def binary_search(arr, target):
+                left, right = 0, len(arr) - 1
+                while left <= right:
+                    mid = (left + right) // 2
+                    if arr[mid] == target:
+                        return mid
+                    elif arr[mid] < target:
+                        left = mid + 1
+                    else:
+                        right = mid - 1
+                return -1
+        ''',
+    },
+    {
+        'name': 'linear_search',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(1)',
+        'best_case': 'O(1)', 'average_case': 'O(n)', 'worst_case': 'O(n)',
+        'patterns': ['Linear Scan'], 'algorithm_type': 'Brute Force',
+        'reasoning': ['Each element is compared at most once'],
+        'source': '''
+            def linear_search(arr, target):
+                for i in range(len(arr)):
+                    if arr[i] == target:
+                        return i
+                return -1
+        ''',
+    },
+    {
+        'name': 'bubble_sort',
+        'time_complexity': 'O(n^2)', 'space_complexity': 'O(1)',
+        'best_case': 'O(n^2)', 'average_case': 'O(n^2)', 'worst_case': 'O(n^2)',
+        'patterns': ['Bubble Sort'], 'algorithm_type': 'Comparison Sort',
+        'reasoning': ['Two nested loops compare adjacent pairs, about n^2/2 comparisons',
+                      'Sorting happens in place'],
+        'source': '''
+            def bubble_sort(arr):
+                n = len(arr)
+                for i in range(n):
+                    for j in range(0, n - i - 1):
+                        if arr[j] > arr[j + 1]:
+                            arr[j], arr[j + 1] = arr[j + 1], arr[j]
+                return arr
+        ''',
+    },
+    {
+        'name': 'bubble_sort_early_exit',
+        'time_complexity': 'O(n^2)', 'space_complexity': 'O(1)',
+        'best_case': 'O(n)', 'average_case': 'O(n^2)', 'worst_case': 'O(n^2)',
+        'patterns': ['Bubble Sort'], 'algorithm_type': 'Comparison Sort',
+        'reasoning': ['Two nested loops compare adjacent pairs, about n^2/2 comparisons',
+                      'A pass without swaps ends early, so sorted input takes O(n)'],
+        'source': '''
+            def bubble_sort(arr):
+                n = len(arr)
+                for i in range(n):
+                    swapped = False
+                    for j in range(0, n - i - 1):
+                        if arr[j] > arr[j + 1]:
+                            arr[j], arr[j + 1] = arr[j + 1], arr[j]
+                            swapped = True
+                    if not swapped:
+                        break
+                return arr
+        ''',
+    },
+    {
+        'name': 'insertion_sort',
+        'time_complexity': 'O(n^2)', 'space_complexity': 'O(1)',
+        'best_case': 'O(n)', 'average_case': 'O(n^2)', 'worst_case': 'O(n^2)',
+        'patterns': ['Insertion Sort'], 'algorithm_type': 'Comparison Sort',
+        'reasoning': ['Each element may shift past every earlier element',
+                      'Already sorted input needs only one comparison per element'],
+        'source': '''
+            def insertion_sort(arr):
+                for i in range(1, len(arr)):
+                    key = arr[i]
+                    j = i - 1
+                    while j >= 0 and arr[j] > key:
+                        arr[j + 1] = arr[j]
+                        j -= 1
+                    arr[j + 1] = key
+                return arr
+        ''',
+    },
+    {
+        'name': 'selection_sort',
+        'time_complexity': 'O(n^2)', 'space_complexity': 'O(1)',
+        'best_case': 'O(n^2)', 'average_case': 'O(n^2)', 'worst_case': 'O(n^2)',
+        'patterns': ['Selection Sort'], 'algorithm_type': 'Comparison Sort',
+        'reasoning': ['Each pass scans the unsorted suffix for its minimum'],
+        'source': '''
+            def selection_sort(arr):
+                n = len(arr)
+                for i in range(n):
+                    smallest = i
+                    for j in range(i + 1, n):
+                        if arr[j] < arr[smallest]:
+                            smallest = j
+                    arr[i], arr[smallest] = arr[smallest], arr[i]
+                return arr
+        ''',
+    },
+    {
+        'name': 'fibonacci_recursive',
+        'time_complexity': 'O(2^n)', 'space_complexity': 'O(n)',
+        'best_case': 'O(1)', 'average_case': 'O(2^n)', 'worst_case': 'O(2^n)',
+        'patterns': ['Recursion'], 'algorithm_type': 'Recursion',
+        'reasoning': ['T(n) = T(n-1) + T(n-2) + O(1) grows as phi^n, bounded by O(2^n)',
+                      'The recursion stack is at most n deep'],
+        'source': '''
+            def fibonacci(n):
+                if n <= 1:
+                    return n
+                return fibonacci(n - 1) + fibonacci(n - 2)
+        ''',
+    },
+    {
+        'name': 'fibonacci_dp',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(n)',
+        'best_case': 'O(1)', 'average_case': 'O(n)', 'worst_case': 'O(n)',
+        'patterns': ['Dynamic Programming'], 'algorithm_type': 'Dynamic Programming',
+        'reasoning': ['Each of the n table entries is filled once from the previous two'],
+        'source': '''
+            def fibonacci_dp(n):
+                if n <= 1:
+                    return n
+                dp = [0] * (n + 1)
+                dp[1] = 1
+                for i in range(2, n + 1):
+                    dp[i] = dp[i - 1] + dp[i - 2]
+                return dp[n]
+        ''',
+    },
+    {
+        'name': 'two_sum_hash_map',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(n)',
+        'best_case': 'O(1)', 'average_case': 'O(n)', 'worst_case': 'O(n)',
+        'patterns': ['Hash Map Lookup'], 'algorithm_type': 'Hashing',
+        'reasoning': ['One pass with O(1) average hash map lookups',
+                      'The map may hold every element'],
+        'source': '''
+            def two_sum(nums, target):
+                seen = {}
+                for i, num in enumerate(nums):
+                    complement = target - num
+                    if complement in seen:
+                        return [seen[complement], i]
+                    seen[num] = i
+                return None
+        ''',
+    },
+    {
+        'name': 'merge_sort',
+        'time_complexity': 'O(n log n)', 'space_complexity': 'O(n)',
+        'best_case': 'O(n log n)', 'average_case': 'O(n log n)', 'worst_case': 'O(n log n)',
+        'patterns': ['Divide and Conquer'], 'algorithm_type': 'Divide and Conquer',
+        'reasoning': ['T(n) = 2T(n/2) + O(n) solves to O(n log n) by the Master theorem',
+                      'Slices and merged lists use O(n) extra space'],
+        'source': '''
+            def merge_sort(arr):
+                if len(arr) <= 1:
+                    return arr
+                mid = len(arr) // 2
+                left = merge_sort(arr[:mid])
+                right = merge_sort(arr[mid:])
+                return merge(left, right)
+        ''',
+    },
+    {
+        'name': 'merge_sorted_lists',
+        'time_complexity': 'O(n + m)', 'space_complexity': 'O(n + m)',
+        'best_case': 'O(n + m)', 'average_case': 'O(n + m)', 'worst_case': 'O(n + m)',
+        'patterns': ['Two Pointers'], 'algorithm_type': 'Iterative',
+        'reasoning': ['Each element of both inputs is appended exactly once'],
+        'source': '''
+            def merge(left, right):
+                result = []
+                i = j = 0
+                while i < len(left) and j < len(right):
+                    if left[i] <= right[j]:
+                        result.append(left[i])
+                        i += 1
+                    else:
+                        result.append(right[j])
+                        j += 1
+                result.extend(left[i:])
+                result.extend(right[j:])
+                return result
+        ''',
+    },
+    {
+        'name': 'kadane',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(1)',
+        'best_case': 'O(n)', 'average_case': 'O(n)', 'worst_case': 'O(n)',
+        'patterns': ['Dynamic Programming'], 'algorithm_type': 'Dynamic Programming',
+        'reasoning': ['A single pass keeps the best sum ending at each position'],
+        'source': '''
+            def find_max_subarray(arr):
+                max_sum = current_sum = arr[0]
+                for num in arr[1:]:
+                    current_sum = max(num, current_sum + num)
+                    max_sum = max(max_sum, current_sum)
+                return max_sum
+        ''',
+    },
+    {
+        'name': 'longest_palindromic_substring_dp',
+        'time_complexity': 'O(n^2)', 'space_complexity': 'O(n^2)',
+        'best_case': 'O(n^2)', 'average_case': 'O(n^2)', 'worst_case': 'O(n^2)',
+        'patterns': ['Dynamic Programming'], 'algorithm_type': 'Dynamic Programming',
+        'reasoning': ['Every (i, j) pair of the n x n table is filled once'],
+        'source': '''
+            def longest_palindromic_substring(s):
+                n = len(s)
+                if n < 2:
+                    return s
+                dp = [[False] * n for _ in range(n)]
+                start = 0
+                max_length = 1
+                for i in range(n):
+                    dp[i][i] = True
+                for i in range(n - 1):
+                    if s[i] == s[i + 1]:
+                        dp[i][i + 1] = True
+                        start = i
+                        max_length = 2
+                for length in range(3, n + 1):
+                    for i in range(n - length + 1):
+                        j = i + length - 1
+                        if s[i] == s[j] and dp[i + 1][j - 1]:
+                            dp[i][j] = True
+                            start = i
+                            max_length = length
+                return s[start:start + max_length]
+        ''',
+    },
+    {
+        'name': 'coin_change_dp',
+        'time_complexity': 'O(amount * len(coins))', 'space_complexity': 'O(amount)',
+        'best_case': 'O(amount * len(coins))', 'average_case': 'O(amount * len(coins))',
+        'worst_case': 'O(amount * len(coins))',
+        'patterns': ['Dynamic Programming'], 'algorithm_type': 'Dynamic Programming',
+        'reasoning': ['Each amount up to the target tries every coin once'],
+        'source': '''
+            def coin_change_dp(coins, amount):
+                dp = [float('inf')] * (amount + 1)
+                dp[0] = 0
+                for i in range(1, amount + 1):
+                    for coin in coins:
+                        if coin <= i:
+                            dp[i] = min(dp[i], dp[i - coin] + 1)
+                return dp[amount] if dp[amount] != float('inf') else -1
+        ''',
+    },
+    {
+        'name': 'bfs_shortest_path',
+        'time_complexity': 'O(V + E)', 'space_complexity': 'O(V)',
+        'best_case': 'O(1)', 'average_case': 'O(V + E)', 'worst_case': 'O(V + E)',
+        'patterns': ['Graph BFS'], 'algorithm_type': 'Graph Traversal',
+        'reasoning': ['Each vertex is enqueued once and each edge examined once'],
+        'source': '''
+            def bfs_shortest_path(graph, start, end):
+                from collections import deque
+                queue = deque([(start, [start])])
+                visited = {start}
+                while queue:
+                    node, path = queue.popleft()
+                    if node == end:
+                        return path
+                    for neighbor in graph.get(node, []):
+                        if neighbor not in visited:
+                            visited.add(neighbor)
+                            queue.append((neighbor, path + [neighbor]))
+                return None
+        ''',
+    },
+    {
+        'name': 'sliding_window_max',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(k)',
+        'best_case': 'O(n)', 'average_case': 'O(n)', 'worst_case': 'O(n)',
+        'patterns': ['Sliding Window', 'Monotonic Queue'], 'algorithm_type': 'Iterative',
+        'reasoning': ['Each index is pushed and popped from the deque at most once'],
+        'source': '''
+            def sliding_window_max(nums, k):
+                from collections import deque
+                if not nums:
+                    return []
+                deq = deque()
+                result = []
+                for i in range(len(nums)):
+                    while deq and deq[0] < i - k + 1:
+                        deq.popleft()
+                    while deq and nums[deq[-1]] < nums[i]:
+                        deq.pop()
+                    deq.append(i)
+                    if i >= k - 1:
+                        result.append(nums[deq[0]])
+                return result
+        ''',
+    },
+    {
+        'name': 'quick_select',
+        'time_complexity': 'O(n)', 'space_complexity': 'O(n)',
+        'best_case': 'O(n)', 'average_case': 'O(n)', 'worst_case': 'O(n^2)',
+        'patterns': ['Divide and Conquer'], 'algorithm_type': 'Divide and Conquer',
+        'reasoning': ['T(n) = T(n/2) + O(n) on average, O(n^2) with consistently bad pivots',
+                      'Partition lists copy the input at each level'],
+        'source': '''
+            def quick_select(arr, k):
+                if len(arr) == 1:
+                    return arr[0]
+                pivot = arr[len(arr) // 2]
+                left = [x for x in arr if x < pivot]
+                mid = [x for x in arr if x == pivot]
+                right = [x for x in arr if x > pivot]
+                if k < len(left):
+                    return quick_select(left, k)
+                elif k < len(left) + len(mid):
+                    return mid[0]
+                else:
+                    return quick_select(right, k - len(left) - len(mid))
+        ''',
+    },
+]
+
+
+def _tokens(node: ast.AST, tokens: Optional[List[str]] = None,
+            names: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Preorder token stream of an AST with literals erased and user identifiers
+    renamed in order of first appearance (v0, v1, ...), so `left = mid + 1`
+    and `left = left + 1` stay distinct while `lo`/`hi` still match `left`/`right`
+    """
+    tokens = [] if tokens is None else tokens
+    names = {} if names is None else names
+
+    def rename(identifier: str) -> str:
+        return names.setdefault(identifier, f"v{len(names)}")
+
+    if isinstance(node, (ast.Load, ast.Store, ast.Del)):
+        return tokens
+    if (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)):
+        # Docstrings carry no structure
+        return tokens
+    if isinstance(node, ast.Name):
+        tokens.append(f"Name:{node.id}" if node.id in _BUILTINS and node.id not in names
+                      else f"Name:{rename(node.id)}")
+    elif isinstance(node, ast.arg):
+        tokens.append(f"arg:{rename(node.arg)}")
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        tokens.append(f"{type(node).__name__}:{rename(node.name)}")
+    elif isinstance(node, ast.Attribute):
+        tokens.append(f"Attr:{node.attr}")
+    elif isinstance(node, ast.Constant):
+        tokens.append(f"Const:{type(node.value).__name__}")
+    else:
+        tokens.append(type(node).__name__)
+    for child in ast.iter_child_nodes(node):
+        _tokens(child, tokens, names)
+    return tokens
+
+
+def shingles(source: str) -> set:
+    """
+    AST shingles of a piece of code
+
+    Args:
+        source: The code to shingle
+
+    Returns:
+        Set of 64-bit hashes of SHINGLE_SIZE-grams over the normalized AST
+    """
+    tokens = _tokens(ast.parse(textwrap.dedent(source)))
+    grams = [' '.join(tokens[i:i + SHINGLE_SIZE])
+             for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))]
+    return {int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+            for gram in grams}
+
+
+def minhash(shingle_set: set) -> List[int]:
+    """MinHash signature of a shingle set"""
+    return [min((a * value + b) % _PRIME for value in shingle_set)
+            for a, b in _PERMUTATIONS]
+
+
+def _decorators(source: str) -> List[str]:
+    """Decorator names of the functions in source, e.g. ['lru_cache']"""
+    names = set()
+    for node in ast.walk(ast.parse(textwrap.dedent(source))):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                target = decorator.func if isinstance(decorator, ast.Call) else decorator
+                names.add(target.attr if isinstance(target, ast.Attribute)
+                          else getattr(target, 'id', ''))
+    return sorted(names)
+
+
+def _shape(source: str) -> Dict:
+    """
+    Structure that decides complexity but barely moves a MinHash estimate:
+    loop-nesting depth, the number of recursive call sites, and the builtins
+    and methods called. Calls to the function itself are recorded as 'self'
+    and other free functions as 'call', so helper and function names need
+    not match.
+    """
+    tree = ast.parse(textwrap.dedent(source))
+    own = {node.name for node in ast.walk(tree)
+           if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+
+    def depth(node: ast.AST, level: int = 0) -> int:
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.comprehension)):
+            level += 1
+        return max([level] + [depth(child, level) for child in ast.iter_child_nodes(node)])
+
+    calls, recursive_calls = set(), 0
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if isinstance(node.func, ast.Attribute):
+            calls.add(f".{node.func.attr}")
+        elif isinstance(node.func, ast.Name):
+            name = node.func.id
+            recursive_calls += name in own
+            calls.add('self' if name in own else name if name in _BUILTINS else 'call')
+    return {'loop_depth': depth(tree), 'calls': sorted(calls), 'recursive_calls': recursive_calls}
+
+
+def estimate_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+
+class FingerprintIndex:
+    """MinHash signatures of vetted implementations with LSH buckets for lookup"""
+
+    def __init__(self):
+        self.entries: List[Dict] = []
+        self._buckets: List[Dict[tuple, List[int]]] = [{} for _ in range(BANDS)]
+
+    def add(self, source: str, labels: Dict):
+        """
+        Add a vetted implementation to the index
+
+        Args:
+            source: Source of the implementation
+            labels: Vetted labels; 'name', 'time_complexity' and
+                'space_complexity' are required
+        """
+        entry = dict(labels)
+        entry['source'] = textwrap.dedent(source).strip('\n')
+        entry['signature'] = minhash(shingles(entry['source']))
+        entry['decorators'] = _decorators(entry['source'])
+        entry['shape'] = _shape(entry['source'])
+        self._insert(entry)
+
+    def _insert(self, entry: Dict):
+        """Store an entry and file it under its LSH band buckets"""
+        position = len(self.entries)
+        self.entries.append(entry)
+        signature = entry['signature']
+        for band in range(BANDS):
+            key = tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+            self._buckets[band].setdefault(key, []).append(position)
+
+    def lookup(self, source: str, threshold: Optional[float] = None) -> Optional[Dict]:
+        """
+        Find the closest vetted implementation
+
+        Args:
+            source: The code to look up
+            threshold: Minimum similarity, defaults to SIMILARITY_THRESHOLD
+
+        Returns:
+            The matching entry with a 'similarity' score, or None
+        """
+        threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+        signature = minhash(shingles(source))
+        candidates = set()
+        for band in range(BANDS):
+            key = tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+            candidates.update(self._buckets[band].get(key, []))
+
+        # Decorators such as lru_cache, an extra loop level or a call like arr.sort()
+        # change complexity without changing much structure
+        decorators = _decorators(source)
+        shape = _shape(source)
+        best, best_similarity = None, threshold
+        for position in candidates:
+            if (self.entries[position].get('decorators', []) != decorators
+                    or self.entries[position].get('shape') != shape):
+                continue
+            similarity = estimate_similarity(signature, self.entries[position]['signature'])
+            if similarity >= best_similarity:
+                best, best_similarity = self.entries[position], similarity
+        if best is None:
+            return None
+        match = {key: value for key, value in best.items()
+                 if key not in ('signature', 'decorators', 'shape')}
+        match['similarity'] = best_similarity
+        return match
+
+    def save(self, path: Optional[str] = None):
+        """Write the index to disk as JSON"""
+        with open(path or INDEX_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'num_permutations': NUM_PERMUTATIONS, 'shingle_size': SHINGLE_SIZE,
+                       'tokenizer_version': TOKENIZER_VERSION,
+                       'entries': self.entries}, f, indent=1)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'FingerprintIndex':
+        """
+        Load an index from disk, re-signing entries built with other parameters
+
+        Args:
+            path: Index file, defaults to INDEX_PATH
+
+        Returns:
+            The loaded index
+        """
+        with open(path or INDEX_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        current = (data.get('num_permutations') == NUM_PERMUTATIONS
+                   and data.get('shingle_size') == SHINGLE_SIZE
+                   and data.get('tokenizer_version') == TOKENIZER_VERSION)
+        for entry in data.get('entries', []):
+            if current:
+                index._insert(entry)
+            else:
+                index.add(entry['source'], {k: v for k, v in entry.items()
+                                    if k not in ('signature', 'decorators', 'shape')})
+        return index
+
+
+def build_canonical_index() -> FingerprintIndex:
+    """Build an index from the bundled CANONICAL_ALGORITHMS"""
+    index = FingerprintIndex()
+    for algorithm in CANONICAL_ALGORITHMS:
+        index.add(algorithm['source'], {k: v for k, v in algorithm.items() if k != 'source'})
+    return index
+
+
+def add_vetted_results(index: FingerprintIndex, min_confidence: str = 'high',
+                       db_path: Optional[str] = None) -> int:
+    """
+    Extend the index with stored results whose source is still unchanged on disk
+
+    Args:
+        index: The index to extend
+        min_confidence: Only import results at this confidence ('high' or 'medium')
+        db_path: Result store path, defaults to the store's DB_PATH
+
+    Returns:
+        Number of entries added
+    """
+    levels = ('high',) if min_confidence == 'high' else ('high', 'medium')
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT file, function, fingerprint, result FROM functions"
+            f" WHERE confidence IN ({', '.join('?' for _ in levels)})", levels
+        ).fetchall()
+    finally:
+        conn.close()
+
+    known = {code_fingerprint(entry['source']) for entry in index.entries}
+    added = 0
+    for row in rows:
+        source = function_source(row['file'], row['function'])
+        if not source or code_fingerprint(source) != row['fingerprint']:
+            continue
+        fingerprint = code_fingerprint(source)
+        if fingerprint in known:
+            continue
+        result = json.loads(row['result'])
+        labels = {key: result.get(key) for key in
+                  ('time_complexity', 'space_complexity', 'best_case', 'average_case',
+                   'worst_case', 'reasoning')}
+        labels['name'] = f"{Path(row['file']).stem}.{row['function']}"
+        index.add(source, labels)
+        known.add(fingerprint)
+        added += 1
+    return added
+
+
+def function_source(filepath: str, name: str) -> Optional[str]:
+    """
+    Read the source of one top-level function or method from a file
+
+    Args:
+        filepath: File containing the function
+        name: Function name, or Class.method
+
+    Returns:
+        The function source, or None if it cannot be found
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            code = f.read()
+        tree = ast.parse(code)
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if (isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                        and f"{node.name}.{item.name}" == name):
+                    return ast.unparse(item)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            # unparse keeps decorators such as lru_cache, which change complexity
+            return ast.unparse(node)
+    return None
+
+
+_INDEX: Optional[FingerprintIndex] = None
+
+
+def load_index() -> FingerprintIndex:
+    """Load the on-disk index if present, otherwise the bundled canonical index"""
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = FingerprintIndex.load() if os.path.exists(INDEX_PATH) else build_canonical_index()
+    return _INDEX
+
+
+def match_functions(code: str) -> Dict[str, Dict]:
+    """
+    Look up every top-level function of the code in the index
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Map of function name to its closest vetted entry (with 'similarity')
+        for the functions that matched
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+    index = load_index()
+    matches = {}
+    for func in top_level_functions(tree):
+        # unparse keeps decorators, which get_source_segment would drop
+        match = index.lookup(ast.unparse(func))
+        if match:
+            matches[func.name] = match
+    return matches
+
+
+def complexity_entry(name: str, match: Dict) -> Dict:
+    """Turn an index match into an analyze_complexity_with_gemini function entry"""
+    reasoning = [f"Near-duplicate of vetted '{match['name']}' "
+                 f"(similarity {match['similarity']:.2f})"]
+    return {
+        'name': name,
+        'time_complexity': match['time_complexity'],
+        'space_complexity': match['space_complexity'],
+        'confidence': 'high' if match['similarity'] >= 0.95 else 'medium',
+        'reasoning': reasoning + list(match.get('reasoning') or []),
+        'best_case': match.get('best_case') or match['time_complexity'],
+        'average_case': match.get('average_case') or match['time_complexity'],
+        'worst_case': match.get('worst_case') or match['time_complexity'],
+        'optimization_suggestions': [],
+    }
+
+
+def pattern_results(code: str, matches: Dict[str, Dict]) -> Dict:
+    """Turn index matches for the code into a detect_patterns_with_gemini result"""
+    patterns: Dict[str, Dict] = {}
+    algorithm_types = []
+    for name, match in matches.items():
+        for pattern_name in match.get('patterns') or []:
+            entry = patterns.setdefault(pattern_name, {
+                'pattern_name': pattern_name,
+                'confidence': 0.0,
+                'evidence': [],
+                'description': f"Matches vetted implementations labelled {pattern_name}",
+            })
+            entry['confidence'] = max(entry['confidence'], match['similarity'])
+            entry['evidence'].append(f"{name}: near-duplicate of '{match['name']}' "
+                                     f"(similarity {match['similarity']:.2f})")
+        kind = match.get('algorithm_type')
+        if kind and kind not in algorithm_types:
+            algorithm_types.append(kind)
+    ordered = sorted(patterns.values(), key=lambda p: -p['confidence'])
+    return {
+        'patterns': ordered,
+        'data_structures': detect_data_structures(ast.parse(code)),
+        'algorithm_type': ', '.join(algorithm_types),
+        'coding_techniques': [pattern['pattern_name'] for pattern in ordered],
+        'source': 'local',
+    }
@@ -3,21 +3,61 @@ Gemini AI Integration for Enhanced Code Analysis
 Uses Google Gemini API for sophisticated code understanding
 """
 
+import ast
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from fingerprint_index import complexity_entry, match_functions, pattern_results
+from pattern_matcher import detect_patterns_locally, top_level_functions
+from recurrence_solver import solve_recursive_functions
+from result_store import complexity_rank, record_latencies, recent_latencies
+
 # Load environment variables
 load_dotenv()
 
+# Model routing configuration
+DEFAULT_MODEL_NAME = os.getenv('CODE_SENSEI_MODEL', 'gemini-2.5-flash')
+FAST_MODEL_NAME = os.getenv('CODE_SENSEI_FAST_MODEL', 'gemini-2.5-flash-lite')
+STRONG_MODEL_NAME = os.getenv('CODE_SENSEI_STRONG_MODEL', 'gemini-2.5-pro')
+ROUTING_ENABLED = os.getenv('CODE_SENSEI_ROUTING', '1') != '0'
+EASY_MAX_NODES = int(os.getenv('CODE_SENSEI_EASY_MAX_NODES', '150'))
+EASY_MAX_LOOP_DEPTH = int(os.getenv('CODE_SENSEI_EASY_MAX_LOOP_DEPTH', '1'))
+ESCALATE_ON_LOW_CONFIDENCE = os.getenv('CODE_SENSEI_ESCALATE', '1') != '0'
+LOCAL_PATTERNS_ENABLED = os.getenv('CODE_SENSEI_LOCAL_PATTERNS', '1') != '0'
+LOCAL_INDEX_ENABLED = os.getenv('CODE_SENSEI_LOCAL_INDEX', '1') != '0'
+LOCAL_RECURRENCES_ENABLED = os.getenv('CODE_SENSEI_LOCAL_RECURRENCES', '1') != '0'
+
+# Timeout and hedging configuration
+REQUEST_TIMEOUT = float(os.getenv('CODE_SENSEI_REQUEST_TIMEOUT', '60'))
+HEDGING_ENABLED = os.getenv('CODE_SENSEI_HEDGE', '1') != '0'
+HEDGE_DEFAULT_DELAY = float(os.getenv('CODE_SENSEI_HEDGE_DELAY', '10'))
+HEDGE_MIN_SAMPLES = 20
+
+_LATENCIES = deque(maxlen=200)
+# Samples from this run not yet written to the result store
+_UNSAVED_LATENCIES: List[float] = []
+_LATENCY_LOCK = threading.Lock()
+_LATENCIES_LOADED = threading.Event()
+_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix='code-sensei')
+_ERROR_STATE = threading.local()
+
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+_MODELS: Dict[str, 'genai.GenerativeModel'] = {}
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
-    MODEL = genai.GenerativeModel('gemini-2.5-flash')
+    MODEL = genai.GenerativeModel(DEFAULT_MODEL_NAME)
+    _MODELS[DEFAULT_MODEL_NAME] = MODEL
 else:
     MODEL = None
 
@@ -27,16 +67,312 @@ def is_gemini_available() -> bool:
     return GEMINI_API_KEY is not None and MODEL is not None
 
 
-def analyze_complexity_with_gemini(code: str) -> Optional[Dict]:
+def estimate_difficulty(code: str) -> Dict:
+    """
+    Cheap local difficulty estimate used to route requests between models
+
+    Args:
+        code: The code to inspect
+
+    Returns:
+        Dictionary with AST size, maximum loop depth, recursion flag and
+        whether the code is considered easy
+    """
+    try:
+        tree = ast.parse(code)
+        return _difficulty(tree)
+    except (SyntaxError, RecursionError, ValueError):
+        # Unparseable or pathologically deep code is never routed to the fast tier
+        return {'nodes': 0, 'loop_depth': 0, 'recursive': False, 'easy': False}
+
+
+def _difficulty(tree: ast.AST) -> Dict:
+    """AST size, loop depth and recursion of a parsed module"""
+    nodes = sum(1 for _ in ast.walk(tree))
+
+    def loop_depth(node: ast.AST, depth: int = 0) -> int:
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.comprehension)):
+            depth += 1
+        return max([depth] + [loop_depth(child, depth) for child in ast.iter_child_nodes(node)])
+
+    recursive = False
+    for func in ast.walk(tree):
+        if isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for node in ast.walk(func):
+                if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                        and node.func.id == func.name):
+                    recursive = True
+                    break
+        if recursive:
+            break
+
+    depth = loop_depth(tree)
+    easy = nodes <= EASY_MAX_NODES and depth <= EASY_MAX_LOOP_DEPTH and not recursive
+    return {'nodes': nodes, 'loop_depth': depth, 'recursive': recursive, 'easy': easy}
+
+
+def select_model_name(code: str) -> str:
+    """
+    Pick the model tier for a piece of code
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        The fast model name for easy code, otherwise the default model name
+    """
+    if ROUTING_ENABLED and estimate_difficulty(code)['easy']:
+        return FAST_MODEL_NAME
+    return DEFAULT_MODEL_NAME
+
+
+@contextmanager
+def errors_silenced_by(abandoned: threading.Event):
+    """
+    Suppress error messages from this thread once a caller abandons it
+
+    Stages cut off by a deadline keep running in the background; without
+    this their errors would be printed after the results were rendered.
+
+    Args:
+        abandoned: Set by the caller when it stops waiting for this thread
+    """
+    _ERROR_STATE.abandoned = abandoned
+    try:
+        yield
+    finally:
+        _ERROR_STATE.abandoned = None
+
+
+def _report_error(message: str):
+    """Print an error unless the calling stage has been abandoned"""
+    abandoned = getattr(_ERROR_STATE, 'abandoned', None)
+    if abandoned is None or not abandoned.is_set():
+        print(message)
+
+
+def _get_model(model_name: str) -> 'genai.GenerativeModel':
+    """Return a cached GenerativeModel for the given name"""
+    if model_name not in _MODELS:
+        _MODELS[model_name] = genai.GenerativeModel(model_name)
+    return _MODELS[model_name]
+
+
+def _load_latencies():
+    """Seed the in-memory samples with latencies saved by earlier runs"""
+    with _LATENCY_LOCK:
+        if _LATENCIES_LOADED.is_set():
+            return
+        try:
+            saved = recent_latencies(_LATENCIES.maxlen)
+        except (sqlite3.Error, OSError):
+            saved = []
+        # Samples recorded before the load are newer, so they stay at the end
+        current = list(_LATENCIES)
+        _LATENCIES.clear()
+        _LATENCIES.extend(saved + current)
+        _LATENCIES_LOADED.set()
+
+
+def _record_latency(seconds: float):
+    """Record the latency of a successful model call for hedging and save_latencies"""
+    with _LATENCY_LOCK:
+        _LATENCIES.append(seconds)
+        _UNSAVED_LATENCIES.append(seconds)
+
+
+def save_latencies():
+    """
+    Write this run's model-call latencies to the result store in one batch, so
+    later runs can hedge at the observed p95 from their first call. Called by
+    the CLI after results are rendered, never on the path of a model call.
+    """
+    with _LATENCY_LOCK:
+        samples = list(_UNSAVED_LATENCIES)
+        _UNSAVED_LATENCIES.clear()
+    try:
+        record_latencies(samples)
+    except (sqlite3.Error, OSError):
+        # A read-only or locked store only costs the history
+        pass
+
+
+def hedge_delay() -> float:
+    """
+    Delay after which a duplicate request is fired
+
+    Returns:
+        The observed p95 latency once enough calls have been made (in this
+        and earlier runs, via the result store), otherwise the configured
+        default delay
+    """
+    _load_latencies()
+    with _LATENCY_LOCK:
+        samples = sorted(_LATENCIES)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def _generate(prompt: str, model_name: str, timeout: Optional[float] = None) -> str:
+    """
+    Send a prompt to the named model and return the stripped response text
+
+    A duplicate request is fired once the first one runs longer than the
+    observed p95 latency; whichever answers first wins.
+
+    Args:
+        prompt: The prompt to send
+        model_name: Name of the model to use
+        timeout: Seconds allowed for this call, capped by REQUEST_TIMEOUT
+
+    Returns:
+        The response text
+
+    Raises:
+        TimeoutError: If no answer arrived within the timeout
+    """
+    timeout = REQUEST_TIMEOUT if timeout is None else min(timeout, REQUEST_TIMEOUT)
+    deadline = time.monotonic() + timeout
+    model = _get_model(model_name)
+
+    def call() -> str:
+        start = time.monotonic()
+        remaining = max(deadline - start, 0.001)
+        response = model.generate_content(prompt, request_options={'timeout': remaining})
+        text = response.text.strip()
+        _record_latency(time.monotonic() - start)
+        return text
+
+    pending = {_EXECUTOR.submit(call)}
+    delay = hedge_delay()
+    # A hedge fired at (or after) the timeout could never answer in time
+    if HEDGING_ENABLED and delay < timeout:
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            pending.add(_EXECUTOR.submit(call))
+
+    error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            error = future.exception()
+
+    if error is not None and not pending:
+        raise error
+    raise TimeoutError(f"{model_name} did not answer within {timeout:.1f}s")
+
+
+def _parse_json_response(response_text: str, expected: type = dict):
+    """
+    Extract and parse a JSON payload, tolerating markdown code fences
+
+    Raises:
+        ValueError: If the payload is not valid JSON of the expected type
+    """
+    if '```json' in response_text:
+        json_start = response_text.find('```json') + 7
+        json_end = response_text.find('```', json_start)
+        response_text = response_text[json_start:json_end].strip()
+    elif '```' in response_text:
+        json_start = response_text.find('```') + 3
+        json_end = response_text.find('```', json_start)
+        response_text = response_text[json_start:json_end].strip()
+    payload = json.loads(response_text)
+    if not isinstance(payload, expected):
+        raise ValueError(f"expected a JSON {expected.__name__}, got {type(payload).__name__}")
+    return payload
+
+
+def _has_low_confidence(results: Dict) -> bool:
+    """Check whether any function in a complexity result has low confidence"""
+    return any(str(func.get('confidence', '')).lower() == 'low'
+               for func in results.get('functions', []))
+
+
+def _function_names(code: str) -> List[str]:
+    """Names of the top-level functions and methods in the code"""
+    try:
+        return [func.name for func in top_level_functions(ast.parse(code))]
+    except (SyntaxError, RecursionError, ValueError):
+        return []
+
+
+def _local_complexity(code: str) -> Dict[str, Dict]:
+    """
+    Complexity entries that can be answered without calling Gemini
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Map of function name to an analyze_complexity_with_gemini entry
+        (empty if the code is too deeply nested to inspect locally)
+    """
+    try:
+        return _derive_local_complexity(code)
+    except (RecursionError, ValueError):
+        # ast.parse and the tree walkers recurse; pathologically deep code
+        # (or source with null bytes) is left to the model
+        return {}
+
+
+def _derive_local_complexity(code: str) -> Dict[str, Dict]:
+    """Solved recurrences, overridden by index matches of the same class"""
+    local = {}
+    if LOCAL_RECURRENCES_ENABLED:
+        local.update(solve_recursive_functions(code))
+    if LOCAL_INDEX_ENABLED:
+        for name, match in match_functions(code).items():
+            entry = complexity_entry(name, match)
+            if name in local:
+                # A look-alike of a vetted solution can still recurse differently; the
+                # vetted labels only replace a recurrence solved to the same class
+                solved = complexity_rank(local[name]['time_complexity'])
+                if solved is None or solved != complexity_rank(entry['time_complexity']):
+                    continue
+            local[name] = entry
+    return local
+
+
+def _merge_local(results: Dict, local: Dict[str, Dict]) -> Dict:
+    """Replace Gemini entries with locally derived ones for the same functions"""
+    if not local:
+        return results
+    functions = [local.get(func.get('name'), func) for func in results.get('functions', [])]
+    answered = {func.get('name') for func in functions}
+    functions += [entry for name, entry in local.items() if name not in answered]
+    return {**results, 'functions': functions}
+
+
+def analyze_complexity_with_gemini(code: str, timeout: Optional[float] = None) -> Optional[Dict]:
     """
     Use Gemini to analyze code complexity with deep understanding
 
+    Functions that are near-duplicates of vetted implementations in the
+    fingerprint index are answered from the index, and recursive functions
+    whose recurrence can be solved locally are answered by the solver.
+
     Args:
         code: The code to analyze
+        timeout: Seconds allowed for the model call
 
     Returns:
         Dictionary with complexity analysis or None if unavailable
     """
+    # Indexed near-duplicates and solvable recursive functions need no model call
+    local = _local_complexity(code)
+    names = _function_names(code)
+    if names and all(name in local for name in names):
+        return {'functions': [local[name] for name in names], 'source': 'local'}
+
     if not is_gemini_available():
         return None
 
@@ -79,34 +415,73 @@ Be precise and thorough. Consider:
 4. Hidden complexities in library functions
 5. Best, average, and worst case scenarios"""
 
-        response = MODEL.generate_content(prompt)
-        response_text = response.text.strip()
-        if '```json' in response_text:
-            json_start = response_text.find('```json') + 7
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        elif '```' in response_text:
-            json_start = response_text.find('```') + 3
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        return json.loads(response_text)
+        started = time.monotonic()
+        model_name = select_model_name(code)
+        results = _parse_json_response(_generate(prompt, model_name, timeout))
+        if (ESCALATE_ON_LOW_CONFIDENCE and model_name != STRONG_MODEL_NAME
+                and _has_low_confidence(results)):
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no time left before the deadline")
+                results = _parse_json_response(_generate(prompt, STRONG_MODEL_NAME, remaining))
+            except Exception as e:
+                _report_error(f"Escalation to {STRONG_MODEL_NAME} failed, keeping {model_name} result: {e}")
+        return _merge_local(results, local)
     except ValueError as ve:
-        print(f"JSON parsing error: {ve}")
+        _report_error(f"JSON parsing error: {ve}")
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        _report_error(f"Gemini API error: {e}")
     return None
 
 
-def detect_patterns_with_gemini(code: str) -> Optional[Dict]:
+def _local_patterns(code: str) -> Optional[Dict]:
+    """
+    Pattern results that can be answered without calling Gemini
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Pattern detection results, or None if the model is needed
+    """
+    try:
+        if LOCAL_PATTERNS_ENABLED:
+            local = detect_patterns_locally(code)
+            if local:
+                return local
+
+        if LOCAL_INDEX_ENABLED:
+            matches = match_functions(code)
+            names = _function_names(code)
+            # Entries imported from the result store carry no pattern labels
+            if names and all(matches.get(name, {}).get('patterns') for name in names):
+                return pattern_results(code, matches)
+    except (RecursionError, ValueError):
+        # Code too deeply nested for the AST passes is left to the model
+        pass
+    return None
+
+
+def detect_patterns_with_gemini(code: str, timeout: Optional[float] = None) -> Optional[Dict]:
     """
     Use Gemini to detect DSA patterns with high accuracy
 
+    Code the local AST matcher classifies confidently, or whose functions
+    are all near-duplicates of indexed implementations, is answered without
+    calling Gemini.
+
     Args:
         code: The code to analyze
+        timeout: Seconds allowed for the model call
 
     Returns:
         Dictionary with pattern detection results or None if unavailable
     """
+    local = _local_patterns(code)
+    if local:
+        return local
+
     if not is_gemini_available():
         return None
 
@@ -165,30 +540,24 @@ Common patterns to look for:
 - K-way Merge
 - Topological Sort"""
 
-        response = MODEL.generate_content(prompt)
-        response_text = response.text.strip()
-        if '```json' in response_text:
-            json_start = response_text.find('```json') + 7
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        elif '```' in response_text:
-            json_start = response_text.find('```') + 3
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        return json.loads(response_text)
+        return _parse_json_response(_generate(prompt, select_model_name(code), timeout))
     except ValueError as ve:
-        print(f"JSON parsing error: {ve}")
+        _report_error(f"JSON parsing error: {ve}")
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        _report_error(f"Gemini API error: {e}")
     return None
 
 
-def get_optimization_suggestions(code: str) -> Optional[List[str]]:
+def get_optimization_suggestions(code: str, timeout: Optional[float] = None,
+                                 hotspots: Optional[List[str]] = None) -> Optional[List[str]]:
     """
     Get optimization suggestions from Gemini
 
     Args:
         code: The code to analyze
+        timeout: Seconds allowed for the model call
+        hotspots: Measured hotspot descriptions from the line profiler; the
+            suggestions are steered towards these lines
 
     Returns:
         List of optimization suggestions or None if unavailable
@@ -197,13 +566,22 @@ def get_optimization_suggestions(code: str) -> Optional[List[str]]:
         return None
 
     try:
+        measured = ''
+        if hotspots:
+            listed = '\n'.join(f"- {hotspot}" for hotspot in hotspots)
+            measured = f"""
+Profiling at growing input sizes found these lines drive the cost:
+{listed}
+Target these lines first and explain how each suggestion changes their growth.
+"""
+
         prompt = f"""Analyze this code and provide specific optimization suggestions.
 
 Code:
 ```python
 {code}
 ```
-
+{measured}
 Provide 3-5 concrete optimization suggestions focusing on:
 1. Time complexity improvements
 2. Space complexity improvements
@@ -218,30 +596,21 @@ Format as a JSON array:
     "Suggestion 3 with example"
 ]"""
 
-        response = MODEL.generate_content(prompt)
-        response_text = response.text.strip()
-        if '```json' in response_text:
-            json_start = response_text.find('```json') + 7
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        elif '```' in response_text:
-            json_start = response_text.find('```') + 3
-            json_end = response_text.find('```', json_start)
-            response_text = response_text[json_start:json_end].strip()
-        return json.loads(response_text)
+        return _parse_json_response(_generate(prompt, select_model_name(code), timeout), list)
     except ValueError as ve:
-        print(f"JSON parsing error: {ve}")
+        _report_error(f"JSON parsing error: {ve}")
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        _report_error(f"Gemini API error: {e}")
     return None
 
 
-def explain_algorithm(code: str) -> Optional[str]:
+def explain_algorithm(code: str, timeout: Optional[float] = None) -> Optional[str]:
     """
     Get a natural language explanation of the algorithm
 
     Args:
         code: The code to explain
+        timeout: Seconds allowed for the model call
 
     Returns:
         Explanation string or None if unavailable
@@ -264,8 +633,7 @@ Explain in 2-3 paragraphs:
 
 Keep it clear and educational, as if teaching a student."""
 
-        response = MODEL.generate_content(prompt)
-        return response.text.strip()
+        return _generate(prompt, select_model_name(code), timeout)
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        _report_error(f"Gemini API error: {e}")
         return None
@@ -0,0 +1,311 @@
+"""
+Line-Level Hotspot Profiler
+Counts executed lines of a function at growing input sizes and fits a growth
+exponent per line, showing which lines drive its asymptotic cost (the trials
+themselves run in sandbox_runner worker processes)
+"""
+
+import ast
+import inspect
+import math
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from input_synthesis import find_function
+
+MAX_LINE_EVENTS = 5_000_000
+MAX_TRIAL_SECONDS = 5.0
+MIN_FIT_SIZES = 3
+MAX_POLYNOMIAL_EXPONENT = 4.0
+
+
+class TrialBudgetExceeded(Exception):
+    """Raised inside a traced function when a trial grows too expensive"""
+
+
+def load_function(code: str, name: str, filename: str = '<code-sensei>') -> Callable:
+    """
+    Execute code in a fresh namespace and return one of its functions
+
+    Args:
+        code: Module source
+        name: Function name
+        filename: Filename used for tracebacks
+
+    Returns:
+        The function object
+
+    Raises:
+        KeyError: If the function is not defined by the code
+    """
+    namespace = {'__name__': '__code_sensei_profile__'}
+    exec(compile(code, filename, 'exec'), namespace)  # pylint: disable=exec-used
+    if not callable(namespace.get(name)):
+        raise KeyError(f"Function '{name}' not found")
+    return namespace[name]
+
+
+def _run_with_settrace(func: Callable, args: tuple, kwargs: dict, filename: str,
+                       counts: Counter, deadline: float):
+    """Count line events with sys.settrace"""
+    events = [0]
+
+    def local(frame, event, _arg):
+        if event == 'line':
+            counts[frame.f_lineno] += 1
+            events[0] += 1
+            if events[0] > MAX_LINE_EVENTS or (events[0] & 0xFFF == 0
+                                               and time.monotonic() > deadline):
+                raise TrialBudgetExceeded()
+        return local
+
+    def global_trace(frame, _event, _arg):
+        return local if frame.f_code.co_filename == filename else None
+
+    previous = sys.gettrace()
+    sys.settrace(global_trace)
+    try:
+        func(*args, **kwargs)
+    finally:
+        sys.settrace(previous)
+
+
+def _run_with_monitoring(func: Callable, args: tuple, kwargs: dict, filename: str,
+                         counts: Counter, deadline: float) -> bool:
+    """Count line events with sys.monitoring (Python 3.12+); False if unavailable"""
+    monitoring = getattr(sys, 'monitoring', None)
+    if monitoring is None:
+        return False
+    tool = monitoring.PROFILER_ID
+    try:
+        monitoring.use_tool_id(tool, 'code-sensei')
+    except ValueError:
+        return False
+
+    events = [0]
+
+    def on_line(code, line_number):
+        if code.co_filename != filename:
+            return monitoring.DISABLE
+        counts[line_number] += 1
+        events[0] += 1
+        if events[0] > MAX_LINE_EVENTS or (events[0] & 0xFFF == 0
+                                           and time.monotonic() > deadline):
+            raise TrialBudgetExceeded()
+        return None
+
+    monitoring.register_callback(tool, monitoring.events.LINE, on_line)
+    try:
+        monitoring.set_events(tool, monitoring.events.LINE)
+        func(*args, **kwargs)
+    finally:
+        monitoring.set_events(tool, 0)
+        monitoring.register_callback(tool, monitoring.events.LINE, None)
+        monitoring.free_tool_id(tool)
+    return True
+
+
+def count_lines(func: Callable, args: tuple, kwargs: Optional[dict] = None,
+                max_seconds: float = MAX_TRIAL_SECONDS) -> Counter:
+    """
+    Execute a function once and count how often each line of its module runs,
+    so work done in helpers defined next to it is counted too
+
+    Args:
+        func: Function to run
+        args: Positional arguments
+        kwargs: Keyword arguments
+        max_seconds: Abort the trial after this long
+
+    Returns:
+        Counter of line number -> hits
+
+    Raises:
+        TrialBudgetExceeded: If the trial exceeded the event or time budget
+    """
+    kwargs = kwargs or {}
+    counts: Counter = Counter()
+    # Decorators such as lru_cache wrap the function in an object without __code__
+    filename = inspect.unwrap(func).__code__.co_filename
+    deadline = time.monotonic() + max_seconds
+    if not _run_with_monitoring(func, args, kwargs, filename, counts, deadline):
+        _run_with_settrace(func, args, kwargs, filename, counts, deadline)
+    return counts
+
+
+def fit_exponent(sizes: Sequence[int], hits: Sequence[int]) -> float:
+    """
+    Least-squares slope of log(hits) against log(n)
+
+    Args:
+        sizes: Input sizes
+        hits: Measurement at each size
+
+    Returns:
+        The growth exponent (0 for constant, 1 for linear, 2 for quadratic...)
+    """
+    points = [(math.log(n), math.log(h)) for n, h in zip(sizes, hits) if n > 0 and h > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def fit_base(sizes: Sequence[int], hits: Sequence[int]) -> float:
+    """
+    Growth base b of hits ~ b^n, from the slope of log(hits) against n
+
+    Args:
+        sizes: Input sizes
+        hits: Measurement at each size
+
+    Returns:
+        The base (1.0 if there is no growth)
+    """
+    points = [(n, math.log(h)) for n, h in zip(sizes, hits) if h > 0]
+    if len(points) < 2:
+        return 1.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return 1.0
+    return math.exp(sum((x - mean_x) * (y - mean_y) for x, y in points) / spread)
+
+
+def growth_label(entry: Dict) -> str:
+    """Readable growth of a profiled line, e.g. 'n^2.0' or '1.62^n'"""
+    if 'base' in entry:
+        return f"{entry['base']:.2f}^n"
+    return f"n^{entry['exponent']:.1f}"
+
+
+def _definitions(tree: ast.AST) -> List[Tuple[str, ast.AST]]:
+    """Module-level functions and class methods, as (name, node) pairs"""
+    found = []
+    for node in getattr(tree, 'body', []):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            found.append((node.name, node))
+        elif isinstance(node, ast.ClassDef):
+            found += [(f"{node.name}.{item.name}", item) for item in node.body
+                      if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    return found
+
+
+def profiled_sections(code: str, name: str, hit_lines: Iterable[int]) -> List[Dict]:
+    """
+    Source to show for a profile: the profiled function, then every other
+    function of the module that ran during the trials (the helpers it calls)
+
+    Args:
+        code: Module source
+        name: Profiled function
+        hit_lines: Line numbers that ran at least once
+
+    Returns:
+        List of sections with 'function', 'first_line' and 'source_lines'
+        (decorators included), without executing the code
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    target = find_function(tree, name)
+    hit = set(hit_lines)
+    code_lines = code.splitlines()
+    sections = []
+    for label, node in _definitions(tree):
+        first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        if node is not target and not hit & set(range(first_line, node.end_lineno + 1)):
+            continue
+        sections.append({
+            'function': label,
+            'first_line': first_line,
+            'source_lines': code_lines[first_line - 1:node.end_lineno],
+        })
+    sections.sort(key=lambda section: section['function'] != name)
+    return sections
+
+
+def summarize_profile(name: str, code: str, sizes: Sequence[int],
+                      per_size: Sequence[Dict[int, int]], stopped_at: Optional[int] = None) -> Dict:
+    """
+    Fit a growth exponent to every line from per-size hit counts
+
+    Args:
+        name: Function name
+        code: Source of the module that defines it
+        sizes: Input sizes that were measured
+        per_size: Line number -> hits, for each size
+        stopped_at: First size that exceeded the budget, if any
+
+    Returns:
+        Dictionary with the measured 'sizes', per-line 'lines' entries
+        (line, function, source, hits, exponent, and base for exponential
+        lines) sorted by growth, the source 'sections' of the function and
+        the helpers that ran, and 'stopped_at'
+    """
+    numbers = sorted(set().union(*per_size)) if per_size else []
+    sections = profiled_sections(code, name, numbers)
+    code_lines = code.splitlines()
+    lines = []
+    for number in numbers:
+        hits = [counts.get(number, 0) for counts in per_size]
+        owner = next((section['function'] for section in sections
+                      if 0 <= number - section['first_line'] < len(section['source_lines'])), '')
+        entry = {
+            'line': number,
+            'function': owner,
+            'source': code_lines[number - 1].rstrip() if 0 < number <= len(code_lines) else '',
+            'hits': hits,
+            'exponent': round(fit_exponent(sizes, hits), 2),
+        }
+        if entry['exponent'] > MAX_POLYNOMIAL_EXPONENT:
+            entry['base'] = round(fit_base(sizes, hits), 2)
+        lines.append(entry)
+    lines.sort(key=lambda entry: (-entry['exponent'], -entry['hits'][-1]))
+    return {
+        'function': name,
+        'sizes': list(sizes),
+        'lines': lines,
+        'sections': sections,
+        'stopped_at': stopped_at,
+    }
+
+
+def top_hotspots(profile: Dict, limit: int = 3) -> List[Dict]:
+    """The lines whose cost grows fastest, ignoring constant-time lines"""
+    growing = [entry for entry in profile['lines'] if entry['exponent'] >= 0.5]
+    if not growing:
+        return []
+    steepest = growing[0]['exponent']
+    return [entry for entry in growing if entry['exponent'] >= steepest - 0.25][:limit]
+
+
+def describe_hotspots(profile: Dict, limit: int = 3) -> List[str]:
+    """
+    One-line descriptions of the measured hotspots, e.g. for prompts
+
+    Args:
+        profile: Result of summarize_profile
+        limit: Maximum number of lines to describe
+
+    Returns:
+        List of descriptions
+    """
+    if not profile['sizes']:
+        return []
+    largest = profile['sizes'][-1]
+    descriptions = []
+    for entry in top_hotspots(profile, limit):
+        where = f" in {entry['function']}" if entry.get('function') else ''
+        descriptions.append(f"Line {entry['line']}{where} `{entry['source'].strip()}` runs "
+                            f"{entry['hits'][-1]:,} times at n={largest}, "
+                            f"growing as {growth_label(entry)}")
+    return descriptions
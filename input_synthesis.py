@@ -0,0 +1,292 @@
+"""
+Input Synthesis
+Infers what kind of value each parameter of a function expects, from type
+hints, default values and how the body uses it, and builds inputs of size n
+"""
+
+import ast
+import random
+from typing import Dict, List, Optional, Tuple
+
+# Kinds, from most to least specific evidence
+# size: an int that is the input size       element: a value compared with sequence items
+# small_int: a small count such as k        node: a start vertex of a graph
+# sequence / sorted_sequence / matrix / graph / dict / set / string / float / bool
+# default: keep the parameter's default value
+
+_ANNOTATION_KINDS = {
+    'int': 'size', 'float': 'float', 'bool': 'bool', 'str': 'string',
+    'list': 'sequence', 'List': 'sequence', 'Sequence': 'sequence', 'tuple': 'sequence',
+    'Tuple': 'sequence', 'Iterable': 'sequence',
+    'dict': 'dict', 'Dict': 'dict', 'Mapping': 'dict', 'set': 'set', 'Set': 'set',
+}
+# Usage evidence that narrows a kind given by a type hint
+_REFINEMENTS = {
+    'size': {'element', 'small_int'},
+    'sequence': {'sorted_sequence', 'matrix'},
+    'dict': {'graph'},
+}
+_STRING_METHODS = {'lower', 'upper', 'split', 'strip', 'startswith', 'endswith', 'isalpha',
+                   'isdigit', 'isalnum', 'replace', 'find', 'join'}
+_DICT_METHODS = {'items', 'keys', 'values', 'get', 'setdefault'}
+_LIST_METHODS = {'append', 'pop', 'sort', 'insert', 'extend', 'remove', 'index'}
+
+_STRING_NAMES = {'s', 'string', 'text', 'word', 't', 'pattern'}
+_SIZE_NAMES = {'n', 'num', 'size', 'amount', 'count', 'length', 'm'}
+_SMALL_NAMES = {'k', 'width', 'window'}
+_ELEMENT_NAMES = {'target', 'x', 'key', 'value', 'val'}
+_NODE_NAMES = {'start', 'source', 'src', 'node', 'begin'}
+_GRAPH_NAMES = {'graph', 'adj', 'adjacency', 'edges', 'neighbors'}
+_MATRIX_NAMES = {'grid', 'matrix', 'board', 'mat'}
+
+Plan = List[Tuple[str, str, bool]]
+
+
+def find_function(tree: ast.AST, name: str) -> Optional[ast.FunctionDef]:
+    """The module-level function definition with the given name"""
+    for node in getattr(tree, 'body', []):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            return node
+    return None
+
+
+def _annotation_kind(annotation: Optional[ast.AST]) -> Optional[str]:
+    """Kind implied by a type hint such as int, List[int] or Dict[int, List[int]]"""
+    if annotation is None:
+        return None
+    base, inner = annotation, None
+    if isinstance(annotation, ast.Subscript):
+        base, inner = annotation.value, annotation.slice
+    name = base.attr if isinstance(base, ast.Attribute) else getattr(base, 'id', None)
+    kind = _ANNOTATION_KINDS.get(name)
+    if kind == 'sequence' and _annotation_kind(inner) == 'sequence':
+        return 'matrix'
+    if kind == 'dict' and isinstance(inner, ast.Tuple) and len(inner.elts) == 2:
+        if _annotation_kind(inner.elts[1]) == 'sequence':
+            return 'graph'
+    return kind
+
+
+def _default_kind(default: ast.AST) -> Optional[str]:
+    """Kind implied by a literal default value"""
+    if isinstance(default, ast.Constant) and default.value is not None:
+        return {int: 'size', float: 'float', bool: 'bool', str: 'string'}.get(type(default.value))
+    if isinstance(default, (ast.List, ast.Tuple)):
+        return 'sequence'
+    if isinstance(default, ast.Dict):
+        return 'dict'
+    return None
+
+
+def _name_kind(name: str) -> str:
+    """Fallback kind guessed from a parameter name"""
+    name = name.lower()
+    if name in _STRING_NAMES:
+        return 'string'
+    if name in _SIZE_NAMES:
+        return 'size'
+    if name in _SMALL_NAMES:
+        return 'small_int'
+    if name in _ELEMENT_NAMES:
+        return 'element'
+    if name in _NODE_NAMES:
+        return 'node'
+    if name in _GRAPH_NAMES:
+        return 'graph'
+    if name in _MATRIX_NAMES:
+        return 'matrix'
+    return 'sequence'
+
+
+def _bare_names(node: ast.AST) -> set:
+    """Names used directly in arithmetic, not inside calls or subscripts"""
+    if isinstance(node, ast.Name):
+        return {node.id}
+    if isinstance(node, ast.BinOp):
+        return _bare_names(node.left) | _bare_names(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _bare_names(node.operand)
+    return set()
+
+
+def _is_midpoint(value: ast.AST) -> bool:
+    """Whether an expression halves something, as in (lo + hi) // 2"""
+    return any(isinstance(child, ast.BinOp)
+               and ((isinstance(child.op, ast.FloorDiv) and getattr(child.right, 'value', None) == 2)
+                    or (isinstance(child.op, ast.RShift) and getattr(child.right, 'value', None) == 1))
+               for child in ast.walk(value))
+
+
+def _usage_kinds(func: ast.FunctionDef, params: List[str]) -> Dict[str, str]:
+    """Kinds implied by how the body uses each parameter"""
+    evidence: Dict[str, set] = {name: set() for name in params}
+    midpoints = {target.id for node in ast.walk(func) if isinstance(node, ast.Assign)
+                 and _is_midpoint(node.value)
+                 for target in node.targets if isinstance(target, ast.Name)}
+
+    def note(node: ast.AST, kind: str):
+        if isinstance(node, ast.Name) and node.id in evidence:
+            evidence[node.id].add(kind)
+
+    for node in ast.walk(func):
+        if isinstance(node, ast.Subscript):
+            note(node.value, 'sequence')
+            if isinstance(node.value, ast.Subscript):
+                note(node.value.value, 'matrix')
+        elif isinstance(node, ast.For):
+            note(node.iter, 'sequence')
+            # `for v in g[u]` walks adjacency lists; `for x in arr[1:]` is just a slice
+            if isinstance(node.iter, ast.Subscript) and not isinstance(node.iter.slice, ast.Slice):
+                note(node.iter.value, 'graph')
+        elif isinstance(node, ast.Call):
+            callee = node.func
+            if isinstance(callee, ast.Name) and callee.id == 'range':
+                for arg in node.args:
+                    for name in _bare_names(arg) & set(evidence):
+                        evidence[name].add('size')
+            elif isinstance(callee, ast.Name) and callee.id == 'len' and node.args:
+                note(node.args[0], 'sequence')
+            elif isinstance(callee, ast.Name) and callee.id == func.name:
+                for arg in node.args:
+                    if isinstance(arg, ast.BinOp) and isinstance(arg.op, (ast.Sub, ast.FloorDiv)):
+                        note(arg.left, 'size')
+            elif isinstance(callee, ast.Attribute):
+                if callee.attr in _STRING_METHODS:
+                    note(callee.value, 'string')
+                elif callee.attr in _DICT_METHODS:
+                    note(callee.value, 'dict')
+                elif callee.attr in _LIST_METHODS:
+                    note(callee.value, 'sequence')
+        elif isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+            items = [op for op in operands if isinstance(op, ast.Subscript)]
+            for operand in operands:
+                if items and isinstance(operand, ast.Name):
+                    note(operand, 'element')
+                elif (isinstance(operand, ast.Name) and not items
+                      and any(isinstance(other, ast.Constant) and isinstance(other.value, int)
+                              for other in operands)):
+                    note(operand, 'size')
+            # arr[mid] < target style comparisons against a sorted sequence
+            if any(isinstance(op, (ast.Lt, ast.Gt, ast.LtE, ast.GtE)) for op in node.ops):
+                for item in items:
+                    if isinstance(item.slice, ast.Name) and item.slice.id in midpoints:
+                        note(item.value, 'sorted_sequence')
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Sub, ast.FloorDiv, ast.Mod)):
+            if isinstance(node.right, ast.Constant) and isinstance(node.right.value, int):
+                note(node.left, 'size')
+
+    kinds = {}
+    for name, found in evidence.items():
+        # A sequence that is also halved or split like a string is that more specific kind
+        for kind in ('matrix', 'graph', 'sorted_sequence', 'string', 'dict', 'sequence',
+                     'element', 'size'):
+            if kind in found:
+                kinds[name] = kind
+                break
+    # An element only makes sense next to a sequence; on its own it is a size
+    if not any(kind in ('sequence', 'sorted_sequence', 'matrix') for kind in kinds.values()):
+        kinds = {name: 'size' if kind == 'element' else kind for name, kind in kinds.items()}
+    return kinds
+
+
+def input_plan(func: ast.FunctionDef) -> Plan:
+    """
+    Decide what kind of value to pass for each parameter
+
+    Type hints win over usage in the body unless the usage narrows them
+    (an int compared with sequence items is an element), and usage wins
+    over the parameter name. Parameters with defaults keep them unless they are the only
+    parameter, in which case the default's type decides their kind.
+
+    Args:
+        func: The function definition
+
+    Returns:
+        List of (parameter, kind, keyword-only) triples
+    """
+    args = func.args
+    positional = args.posonlyargs + args.args
+    if positional and positional[0].arg in ('self', 'cls'):
+        positional = positional[1:]
+    defaults = dict(zip([arg.arg for arg in positional][len(positional) - len(args.defaults):],
+                        args.defaults))
+    defaults.update({arg.arg: default for arg, default
+                     in zip(args.kwonlyargs, args.kw_defaults) if default is not None})
+    all_args = [(arg, False) for arg in positional] + [(arg, True) for arg in args.kwonlyargs]
+    usage = _usage_kinds(func, [arg.arg for arg, _ in all_args])
+
+    plan = []
+    for arg, keyword in all_args:
+        if arg.arg in defaults and len(all_args) > 1:
+            kind = 'default'
+        else:
+            kind = (_annotation_kind(arg.annotation)
+                    or (_default_kind(defaults[arg.arg]) if arg.arg in defaults else None))
+            if kind is None or usage.get(arg.arg) in _REFINEMENTS.get(kind, ()):
+                kind = usage.get(arg.arg) or kind or _name_kind(arg.arg)
+        plan.append((arg.arg, kind, keyword))
+    return plan
+
+
+def plan_for_code(code: str, name: str) -> Optional[Plan]:
+    """Input plan for a module-level function in some source code"""
+    try:
+        func = find_function(ast.parse(code), name)
+    except SyntaxError:
+        return None
+    return input_plan(func) if func else None
+
+
+def build_inputs(plan: Plan, n: int, seed: int = 0) -> tuple:
+    """
+    Build concrete arguments of size n following a plan
+
+    Sequences and strings have n items, graphs n vertices, matrices n rows
+    of n. Elements are chosen absent from the sequences, which is the worst
+    case for searches.
+
+    Args:
+        plan: Result of input_plan
+        n: Input size
+        seed: Random seed, so trials are repeatable
+
+    Returns:
+        (args, kwargs) for one call
+    """
+    rng = random.Random(seed * 1_000_003 + n)
+    args, kwargs = [], {}
+    for name, kind, keyword in plan:
+        if kind == 'default':
+            continue
+        if kind == 'size':
+            value = n
+        elif kind == 'small_int':
+            value = max(1, n // 4)
+        elif kind == 'element':
+            value = n * 4 + 1
+        elif kind == 'node':
+            value = 0
+        elif kind == 'float':
+            value = float(n)
+        elif kind == 'bool':
+            value = True
+        elif kind == 'string':
+            value = ''.join(rng.choice('abcde') for _ in range(n))
+        elif kind == 'sorted_sequence':
+            value = sorted(rng.randrange(n * 4) for _ in range(n))
+        elif kind == 'matrix':
+            value = [[rng.randrange(10) for _ in range(n)] for _ in range(n)]
+        elif kind == 'graph':
+            value = {v: [rng.randrange(n) for _ in range(2)] for v in range(n)}
+        elif kind == 'dict':
+            value = {i: rng.randrange(n * 4) for i in range(n)}
+        elif kind == 'set':
+            value = {rng.randrange(n * 4) for _ in range(n)}
+        else:
+            value = [rng.randrange(n * 4) for _ in range(n)]
+        if keyword:
+            kwargs[name] = value
+        else:
+            args.append(value)
+    return tuple(args), kwargs
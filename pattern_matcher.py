@@ -0,0 +1,786 @@
+"""
+Local DSA Pattern Matcher
+Recognizes common algorithm patterns from their structural signatures in the
+AST, so Gemini only has to look at code the matcher cannot classify
+"""
+
+import ast
+import os
+from typing import Dict, List, Optional
+
+LOCAL_PATTERN_THRESHOLD = float(os.getenv('CODE_SENSEI_LOCAL_PATTERN_THRESHOLD', '0.85'))
+
+ALGORITHM_TYPES = {
+    'Binary Search': 'Divide and Conquer',
+    'Divide and Conquer': 'Divide and Conquer',
+    'Two Pointers': 'Iterative',
+    'Sliding Window': 'Iterative',
+    'Fast & Slow Pointers': 'Iterative',
+    'Cyclic Sort': 'Iterative',
+    'In-place Reversal of LinkedList': 'Iterative',
+    'Merge Intervals': 'Greedy',
+    'Monotonic Stack': 'Iterative',
+    'Monotonic Queue': 'Iterative',
+    'Top K Elements': 'Heap-based Selection',
+    'K-way Merge': 'Heap-based Selection',
+    'Topological Sort': 'Graph Traversal',
+    'Graph BFS': 'Graph Traversal',
+    'Graph DFS': 'Graph Traversal',
+    'Tree BFS': 'Tree Traversal',
+    'Tree DFS': 'Tree Traversal',
+    'Dynamic Programming': 'Dynamic Programming',
+    'Backtracking': 'Backtracking',
+}
+
+_LOOPS = (ast.For, ast.AsyncFor, ast.While)
+
+
+def _src(node: ast.AST) -> str:
+    """Short source form of a node for evidence lines"""
+    text = ast.unparse(node).splitlines()[0]
+    return text if len(text) <= 60 else text[:57] + '...'
+
+
+def _evidence(func: ast.AST, node: ast.AST, text: str) -> str:
+    """Format an evidence line pointing at a node"""
+    return f"{func.name}, line {node.lineno}: {text}"
+
+
+def _name(node: ast.AST) -> Optional[str]:
+    """Return the identifier of a Name node"""
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _call_name(node: ast.AST) -> Optional[str]:
+    """Return 'func' or 'obj.method' for a call"""
+    if not isinstance(node, ast.Call):
+        return None
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        owner = _name(node.func.value)
+        return f"{owner}.{node.func.attr}" if owner else node.func.attr
+    return None
+
+
+def _method_calls(func: ast.AST, method: str) -> List[ast.Call]:
+    """All calls of the form x.method(...) inside func"""
+    return [node for node in ast.walk(func)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == method]
+
+
+def _self_calls(func: ast.AST) -> List[ast.Call]:
+    """Recursive calls of func to itself (plain or via self.)"""
+    calls = []
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Call):
+            continue
+        if _name(node.func) == func.name:
+            calls.append(node)
+        elif (isinstance(node.func, ast.Attribute) and node.func.attr == func.name
+              and _name(node.func.value) == 'self'):
+            calls.append(node)
+    return calls
+
+
+def _step(stmt: ast.AST, op: type) -> Optional[str]:
+    """Name incremented/decremented by an AugAssign such as `x += 1`"""
+    if isinstance(stmt, ast.AugAssign) and isinstance(stmt.op, op):
+        return _name(stmt.target)
+    return None
+
+
+def _steps(node: ast.AST, op: type) -> Dict[str, ast.AST]:
+    """Map of names stepped with the given operator inside node"""
+    found = {}
+    for child in ast.walk(node):
+        name = _step(child, op)
+        if name:
+            found.setdefault(name, child)
+    return found
+
+
+def _compared_names(test: ast.AST) -> List[tuple]:
+    """(left, right, node) name pairs from `a < b` style comparisons in a loop test"""
+    pairs = []
+    for node in ast.walk(test):
+        if (isinstance(node, ast.Compare) and len(node.ops) == 1
+                and isinstance(node.ops[0], (ast.Lt, ast.LtE, ast.Gt, ast.GtE))):
+            left, right = _name(node.left), _name(node.comparators[0])
+            if left and right:
+                pairs.append((left, right, node))
+    return pairs
+
+
+def _assigned_from(func: ast.AST, call_names: tuple) -> Dict[str, ast.AST]:
+    """Names assigned from a call to one of call_names, e.g. `q = deque()`"""
+    found = {}
+    for node in ast.walk(func):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            if _call_name(node.value) in call_names or (
+                    isinstance(node.value.func, ast.Attribute)
+                    and node.value.func.attr in call_names):
+                for target in node.targets:
+                    if _name(target):
+                        found[target.id] = node
+    return found
+
+
+def _pattern(name: str, confidence: float, evidence: List[str], description: str) -> Dict:
+    """Build a pattern entry in the detect_patterns_with_gemini schema"""
+    return {
+        'pattern_name': name,
+        'confidence': confidence,
+        'evidence': evidence,
+        'description': description,
+    }
+
+
+def _detect_binary_search(func: ast.AST) -> Optional[Dict]:
+    """Midpoint of two bounds inside a loop that narrows those bounds"""
+    for call in ast.walk(func):
+        if _call_name(call) in ('bisect.bisect_left', 'bisect.bisect_right', 'bisect_left',
+                                'bisect_right', 'bisect.bisect', 'bisect'):
+            return _pattern('Binary Search', 0.9,
+                            [_evidence(func, call, f"uses {_src(call)}")],
+                            'Uses the bisect module to binary search a sorted sequence')
+
+    for loop in ast.walk(func):
+        if not isinstance(loop, ast.While):
+            continue
+        for low, high, compare in _compared_names(loop.test):
+            for node in ast.walk(loop):
+                if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                        and _name(node.targets[0])):
+                    continue
+                value = node.value
+                is_half = isinstance(value, ast.BinOp) and (
+                    isinstance(value.op, ast.FloorDiv)
+                    or (isinstance(value.op, ast.RShift))
+                    or (isinstance(value.op, ast.Add) and isinstance(value.right, ast.BinOp)
+                        and isinstance(value.right.op, (ast.FloorDiv, ast.RShift))))
+                used = {_name(n) for n in ast.walk(value)}
+                if not (is_half and low in used and high in used):
+                    continue
+                mid = node.targets[0].id
+                evidence = [
+                    _evidence(func, compare, f"loop while `{_src(compare)}`"),
+                    _evidence(func, node, f"midpoint `{_src(node)}`"),
+                ]
+                updates = [n for n in ast.walk(loop)
+                           if isinstance(n, ast.Assign) and len(n.targets) == 1
+                           and _name(n.targets[0]) in (low, high)
+                           and mid in {_name(m) for m in ast.walk(n.value)}]
+                evidence += [_evidence(func, n, f"bound update `{_src(n)}`") for n in updates[:2]]
+                moved = {n.targets[0].id for n in updates}
+                confidence = 0.95 if moved == {low, high} else 0.8
+                return _pattern('Binary Search', confidence, evidence,
+                                f"Halves the search range [{low}, {high}] around {mid} each iteration")
+    return None
+
+
+def _detect_two_pointers(func: ast.AST) -> Optional[Dict]:
+    """Two indices moving toward each other, or advancing over two sequences"""
+    for loop in ast.walk(func):
+        if not isinstance(loop, ast.While):
+            continue
+        inc, dec = _steps(loop, ast.Add), _steps(loop, ast.Sub)
+        for left, right, compare in _compared_names(loop.test):
+            if left in inc and right in dec:
+                return _pattern('Two Pointers', 0.9, [
+                    _evidence(func, compare, f"loop while `{_src(compare)}`"),
+                    _evidence(func, inc[left], f"`{_src(inc[left])}` moves the left pointer"),
+                    _evidence(func, dec[right], f"`{_src(dec[right])}` moves the right pointer"),
+                ], f"Pointers {left} and {right} move toward each other from both ends")
+
+        bounded = []
+        for node in ast.walk(loop.test):
+            if (isinstance(node, ast.Compare) and _name(node.left)
+                    and isinstance(node.ops[0], (ast.Lt, ast.LtE))
+                    and _call_name(node.comparators[0]) == 'len'):
+                bounded.append((node.left.id, node))
+        advanced = [(name, node) for name, node in bounded if name in inc]
+        if len({name for name, _ in advanced}) >= 2:
+            (first, first_node), (second, _) = advanced[0], advanced[1]
+            return _pattern('Two Pointers', 0.85, [
+                _evidence(func, first_node, f"loop while `{_src(loop.test)}`"),
+                _evidence(func, inc[first], f"`{_src(inc[first])}` and `{second} += 1` "
+                                            "advance independently"),
+            ], f"Pointers {first} and {second} walk two sequences in a single pass")
+    return None
+
+
+def _assignments(node: ast.AST, name: str) -> List[ast.AST]:
+    """Plain assignments to a name (including tuple targets) inside node"""
+    found = []
+    for child in ast.walk(node):
+        targets = (child.targets if isinstance(child, ast.Assign)
+                   else [child.target] if isinstance(child, ast.AnnAssign) else [])
+        for target in targets:
+            names = target.elts if isinstance(target, ast.Tuple) else [target]
+            if any(_name(item) == name for item in names):
+                found.append(child)
+    return found
+
+
+def _persists_across(func: ast.AST, loop: ast.AST, name: str) -> bool:
+    """
+    Whether a variable is set before a loop and carried through its iterations
+
+    A window's left edge starts before the loop and only moves forward
+    (`left += 1`, `left = max(left, ...)`); a variable reset inside the loop,
+    like the `j = 0` of a nested pair scan, starts over on every iteration.
+    """
+    inside = {id(child) for child in ast.walk(loop)}
+    before = [node for node in _assignments(func, name)
+              if id(node) not in inside and node.lineno < loop.lineno]
+    resets = [node for node in _assignments(loop, name)
+              if name not in {_name(child) for child in ast.walk(node.value)}]
+    return bool(before) and not resets
+
+
+def _bounds_window(loop: ast.AST, name: str) -> bool:
+    """Whether a variable is read inside a loop other than to step itself"""
+    steps = {id(child) for node in ast.walk(loop) if _step(node, ast.Add) == name
+             for child in ast.walk(node)}
+    return any(isinstance(node, ast.Name) and node.id == name
+               and isinstance(node.ctx, ast.Load) and id(node) not in steps
+               for node in ast.walk(loop))
+
+
+def _detect_sliding_window(func: ast.AST) -> Optional[Dict]:
+    """A right edge driven by a for loop with a left edge that catches up"""
+    params = {arg.arg for arg in func.args.args}
+    for loop in ast.walk(func):
+        if not isinstance(loop, (ast.For, ast.AsyncFor)):
+            continue
+        right = _name(loop.target)
+        if isinstance(loop.target, ast.Tuple) and loop.target.elts:
+            right = _name(loop.target.elts[0])
+        if not right:
+            continue
+        for inner in ast.walk(loop):
+            if inner is loop or not isinstance(inner, ast.While):
+                continue
+            shrink = _steps(inner, ast.Add)
+            for left, node in shrink.items():
+                if (left != right and _persists_across(func, loop, left)
+                        and _bounds_window(loop, left)):
+                    return _pattern('Sliding Window', 0.9, [
+                        _evidence(func, loop, f"`for {right} ...` extends the window"),
+                        _evidence(func, inner, f"`while {_src(inner.test)}` shrinks it"),
+                        _evidence(func, node, f"`{_src(node)}` moves the left edge"),
+                    ], f"Variable-size window [{left}, {right}] grown and shrunk in one pass")
+        for node in ast.walk(loop):
+            if (isinstance(node, ast.BinOp) and isinstance(node.op, ast.Sub)
+                    and _name(node.left) == right and _name(node.right) in params):
+                return _pattern('Sliding Window', 0.85, [
+                    _evidence(func, loop, f"`for {right} ...` slides the window"),
+                    _evidence(func, node, f"`{_src(node)}` references the window start"),
+                ], f"Fixed-size window of width {node.right.id} slid across the input")
+    return None
+
+
+def _detect_fast_slow(func: ast.AST) -> Optional[Dict]:
+    """One pointer advancing one node, another advancing two"""
+    slow = fast = None
+    for node in ast.walk(func):
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1):
+            continue
+        value = node.value
+        if (isinstance(value, ast.Attribute) and value.attr == 'next'
+                and isinstance(value.value, ast.Attribute) and value.value.attr == 'next'):
+            fast = fast or node
+        elif (isinstance(value, ast.Attribute) and value.attr == 'next'
+              and _name(value.value) == _name(node.targets[0])):
+            slow = slow or node
+    if slow and fast:
+        return _pattern('Fast & Slow Pointers', 0.95, [
+            _evidence(func, slow, f"`{_src(slow)}` advances one step"),
+            _evidence(func, fast, f"`{_src(fast)}` advances two steps"),
+        ], 'Two pointers traverse the linked list at different speeds')
+    return None
+
+
+def _detect_monotonic(func: ast.AST) -> Optional[Dict]:
+    """Popping from a stack/deque while its top breaks an ordering"""
+    deques = _assigned_from(func, ('deque', 'collections.deque'))
+    for loop in ast.walk(func):
+        if not (isinstance(loop, ast.While) and isinstance(loop.test, ast.BoolOp)
+                and isinstance(loop.test.op, ast.And)):
+            continue
+        container = _name(loop.test.values[0])
+        if not container:
+            continue
+        compares_top = any(
+            isinstance(node, ast.Compare) and any(
+                isinstance(sub, ast.Subscript) and _name(sub.value) == container
+                and isinstance(sub.slice, ast.UnaryOp)
+                for sub in ast.walk(node))
+            for node in loop.test.values[1:])
+        pops = [call for call in _method_calls(loop, 'pop')
+                if _name(call.func.value) == container]
+        if compares_top and pops:
+            kind = 'Monotonic Queue' if container in deques else 'Monotonic Stack'
+            return _pattern(kind, 0.9, [
+                _evidence(func, loop, f"`while {_src(loop.test)}`"),
+                _evidence(func, pops[0], f"`{_src(pops[0])}` discards entries that break the order"),
+            ], f"{container} is kept in monotonic order by popping from the top")
+    return None
+
+
+def _detect_heap(func: ast.AST) -> Optional[Dict]:
+    """Bounded heaps (Top K) and heaps fed from several sorted lists (K-way Merge)"""
+    calls = [node for node in ast.walk(func) if isinstance(node, ast.Call)]
+    names = [_call_name(call) or '' for call in calls]
+    for call, name in zip(calls, names):
+        if name.split('.')[-1] in ('nlargest', 'nsmallest'):
+            return _pattern('Top K Elements', 0.9, [_evidence(func, call, f"uses `{_src(call)}`")],
+                            'Selects the K largest/smallest elements with a heap')
+    pushes = [call for call, name in zip(calls, names) if name.split('.')[-1] == 'heappush']
+    pops = [call for call, name in zip(calls, names)
+            if name.split('.')[-1] in ('heappop', 'heappushpop', 'heapreplace')]
+    if not pushes or not pops:
+        return None
+
+    for node in ast.walk(func):
+        if (isinstance(node, ast.Compare) and _call_name(node.left) == 'len'
+                and isinstance(node.ops[0], (ast.Gt, ast.GtE))):
+            return _pattern('Top K Elements', 0.9, [
+                _evidence(func, pushes[0], f"`{_src(pushes[0])}` adds to the heap"),
+                _evidence(func, node, f"`{_src(node)}` bounds the heap size"),
+            ], 'Keeps a heap of size K to track the top K elements')
+
+    seeded = any(isinstance(sub, ast.Subscript) and isinstance(sub.slice, ast.Constant)
+                 and sub.slice.value == 0
+                 for push in pushes for sub in ast.walk(push))
+    if seeded and len(pushes) >= 2:
+        return _pattern('K-way Merge', 0.85, [
+            _evidence(func, pushes[0], f"`{_src(pushes[0])}` seeds the heap with list heads"),
+            _evidence(func, pops[0], f"`{_src(pops[0])}` takes the smallest head"),
+        ], 'Merges several sorted sequences through a min-heap of their heads')
+    return None
+
+
+def _detect_topological_sort(func: ast.AST) -> Optional[Dict]:
+    """In-degree counts decremented until a node becomes ready"""
+    decremented = {}
+    for node in ast.walk(func):
+        if (isinstance(node, ast.AugAssign) and isinstance(node.op, ast.Sub)
+                and isinstance(node.target, ast.Subscript) and _name(node.target.value)):
+            decremented.setdefault(node.target.value.id, node)
+    for node in ast.walk(func):
+        if (isinstance(node, ast.Compare) and isinstance(node.left, ast.Subscript)
+                and _name(node.left.value) in decremented
+                and isinstance(node.ops[0], ast.Eq)
+                and isinstance(node.comparators[0], ast.Constant)
+                and node.comparators[0].value == 0):
+            counts = node.left.value.id
+            return _pattern('Topological Sort', 0.95 if 'degree' in counts.lower() else 0.85, [
+                _evidence(func, decremented[counts], f"`{_src(decremented[counts])}` removes an edge"),
+                _evidence(func, node, f"`{_src(node)}` releases nodes with no remaining prerequisites"),
+            ], "Kahn's algorithm: repeatedly takes nodes whose in-degree dropped to zero")
+    return None
+
+
+def _uses_tree_children(func: ast.AST) -> bool:
+    """Whether the code walks .left/.right children"""
+    return any(isinstance(node, ast.Attribute) and node.attr in ('left', 'right')
+               for node in ast.walk(func))
+
+
+def _detect_bfs(func: ast.AST) -> Optional[Dict]:
+    """A FIFO queue drained in a loop"""
+    for loop in ast.walk(func):
+        if not isinstance(loop, ast.While):
+            continue
+        dequeues = _method_calls(loop, 'popleft') + [
+            call for call in _method_calls(loop, 'pop')
+            if call.args and isinstance(call.args[0], ast.Constant) and call.args[0].value == 0]
+        dequeues = [call for call in dequeues
+                    if _name(call.func.value) and _name(call.func.value) in
+                    {_name(n) for n in ast.walk(loop.test)}]
+        if not dequeues:
+            continue
+        queue = dequeues[0].func.value.id
+        enqueues = [call for call in _method_calls(loop, 'append')
+                    if _name(call.func.value) == queue]
+        if not enqueues:
+            continue
+        evidence = [
+            _evidence(func, dequeues[0], f"`{_src(dequeues[0])}` dequeues in FIFO order"),
+            _evidence(func, enqueues[0], f"`{_src(enqueues[0])}` enqueues the next frontier"),
+        ]
+        if _uses_tree_children(loop):
+            return _pattern('Tree BFS', 0.9, evidence, 'Level-order traversal of a tree with a queue')
+        return _pattern('Graph BFS', 0.9, evidence, 'Breadth-first traversal of a graph with a queue')
+    return None
+
+
+def _detect_dfs(func: ast.AST) -> Optional[Dict]:
+    """Recursive (or explicit-stack) exploration of children/neighbors"""
+    recursion = _self_calls(func)
+    if recursion and _uses_tree_children(func):
+        children = [call for call in recursion
+                    if any(isinstance(arg, ast.Attribute) and arg.attr in ('left', 'right')
+                           for arg in call.args)]
+        if children:
+            return _pattern('Tree DFS', 0.9,
+                            [_evidence(func, call, f"recurses into `{_src(call)}`")
+                             for call in children[:2]],
+                            'Depth-first traversal recursing into child subtrees')
+    for loop in ast.walk(func):
+        if not (isinstance(loop, (ast.For, ast.AsyncFor)) and isinstance(loop.iter, ast.Subscript)):
+            continue
+        graph = _name(loop.iter.value)
+        neighbor = _name(loop.target)
+        inner_recursion = [call for call in recursion
+                           if any(_name(arg) == neighbor for arg in call.args)]
+        if graph and neighbor and inner_recursion:
+            return _pattern('Graph DFS', 0.9, [
+                _evidence(func, loop, f"`for {neighbor} in {_src(loop.iter)}` visits neighbors"),
+                _evidence(func, inner_recursion[0], f"`{_src(inner_recursion[0])}` goes deeper first"),
+            ], 'Depth-first traversal of an adjacency list')
+    return None
+
+
+def _detect_dynamic_programming(func: ast.AST) -> Optional[Dict]:
+    """Tables filled from earlier entries, memoized recursion, or Kadane-style recurrences"""
+    for decorator in func.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        label = target.attr if isinstance(target, ast.Attribute) else _name(target)
+        if label in ('lru_cache', 'cache') and _self_calls(func):
+            return _pattern('Dynamic Programming', 0.95,
+                            [_evidence(func, decorator, f"`@{_src(decorator)}` memoizes recursion")],
+                            'Top-down dynamic programming through memoized recursion')
+
+    for node in ast.walk(func):
+        if (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+                and isinstance(node.test.ops[0], ast.In) and _self_calls(func)):
+            cache = _name(node.test.comparators[0])
+            if cache and any(isinstance(stmt, ast.Return) for stmt in node.body):
+                return _pattern('Dynamic Programming', 0.9, [
+                    _evidence(func, node, f"`if {_src(node.test)}` returns cached results"),
+                ], f'Top-down dynamic programming memoized in {cache}')
+
+    # Conditions guarding a write count as reads, e.g. `if dp[i + 1][j - 1]: dp[i][j] = True`
+    guards = {}
+    for node in ast.walk(func):
+        if isinstance(node, ast.If):
+            for stmt in ast.walk(node):
+                guards.setdefault(stmt, node.test)
+
+    for node in ast.walk(func):
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Subscript)):
+            continue
+        root = node.targets[0].value
+        while isinstance(root, ast.Subscript):
+            root = root.value
+        table = _name(root)
+        sources = [node.value] + ([guards[node]] if node in guards else [])
+        reads = [sub for source in sources for sub in ast.walk(source)
+                 if isinstance(sub, ast.Subscript) and table
+                 and table in {_name(n) for n in ast.walk(sub.value)}
+                 and any(isinstance(n, ast.BinOp) for n in ast.walk(sub.slice))]
+        if table and reads:
+            return _pattern('Dynamic Programming', 0.9, [
+                _evidence(func, node, f"`{_src(node)}` builds on earlier entries of {table}"),
+            ], f'Bottom-up dynamic programming over the table {table}')
+
+    for loop in ast.walk(func):
+        if not isinstance(loop, (ast.For, ast.AsyncFor)):
+            continue
+        for node in ast.walk(loop):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1 and _name(node.targets[0])
+                    and _call_name(node.value) in ('max', 'min')
+                    and any(isinstance(arg, ast.BinOp)
+                            and node.targets[0].id in {_name(n) for n in ast.walk(arg)}
+                            for arg in node.value.args)):
+                return _pattern('Dynamic Programming', 0.85, [
+                    _evidence(func, node, f"`{_src(node)}` extends the best answer ending here"),
+                ], "Kadane-style recurrence carried in a single variable")
+    return None
+
+
+def _detect_backtracking(func: ast.AST) -> Optional[Dict]:
+    """Choose (append), explore (recurse), un-choose (pop)"""
+    if not _self_calls(func):
+        return None
+    for block in ast.walk(func):
+        body = getattr(block, 'body', None)
+        if not isinstance(body, list):
+            continue
+        for i, stmt in enumerate(body):
+            choose = stmt.value if isinstance(stmt, ast.Expr) else None
+            if not (isinstance(choose, ast.Call) and isinstance(choose.func, ast.Attribute)
+                    and choose.func.attr in ('append', 'add')):
+                continue
+            container = _name(choose.func.value)
+            rest = body[i + 1:]
+            recurses = any(_name(call.func) == func.name for node in rest
+                           for call in ast.walk(node) if isinstance(call, ast.Call))
+            undo = [call for node in rest for call in ast.walk(node)
+                    if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                    and call.func.attr in ('pop', 'remove', 'discard')
+                    and _name(call.func.value) == container]
+            if container and recurses and undo:
+                return _pattern('Backtracking', 0.9, [
+                    _evidence(func, stmt, f"`{_src(stmt)}` makes a choice"),
+                    _evidence(func, undo[0], f"`{_src(undo[0])}` undoes it after recursing"),
+                ], f'Explores choices recursively, undoing changes to {container} on the way back')
+    return None
+
+
+def _detect_cyclic_sort(func: ast.AST) -> Optional[Dict]:
+    """Swapping each value into the index it names"""
+    for loop in ast.walk(func):
+        if not isinstance(loop, ast.While):
+            continue
+        for node in ast.walk(loop):
+            if not (isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Tuple)
+                    and len(node.targets[0].elts) == 2
+                    and all(isinstance(elt, ast.Subscript) for elt in node.targets[0].elts)):
+                continue
+            first, second = node.targets[0].elts
+            array = _name(first.value)
+            # Indices derived from the values themselves, e.g. `j = nums[i] - 1`
+            derived = {stmt.targets[0].id for stmt in ast.walk(loop)
+                       if isinstance(stmt, ast.Assign) and _name(stmt.targets[0])
+                       and any(isinstance(sub, ast.Subscript) and _name(sub.value) == array
+                               for sub in ast.walk(stmt.value))}
+            if array and array == _name(second.value) and any(
+                    (isinstance(sub, ast.Subscript) and _name(sub.value) == array)
+                    or _name(sub) in derived
+                    for elt in (first, second) for sub in ast.walk(elt.slice)):
+                return _pattern('Cyclic Sort', 0.85, [
+                    _evidence(func, node, f"`{_src(node)}` swaps a value into its own index"),
+                ], f'Places each value of {array} at the index it denotes')
+    return None
+
+
+def _detect_linked_list_reversal(func: ast.AST) -> Optional[Dict]:
+    """Re-pointing `.next` to the previous node while walking forward"""
+    repoint = advance = None
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Assign):
+            continue
+        targets = node.targets[0].elts if isinstance(node.targets[0], ast.Tuple) else node.targets
+        values = node.value.elts if isinstance(node.value, ast.Tuple) else [node.value]
+        for target, value in zip(targets, values):
+            if isinstance(target, ast.Attribute) and target.attr == 'next' and _name(value):
+                repoint = repoint or node
+            if _name(target) and isinstance(value, ast.Attribute) and value.attr == 'next':
+                advance = advance or node
+    if repoint and advance and any(isinstance(loop, ast.While) for loop in ast.walk(func)):
+        return _pattern('In-place Reversal of LinkedList', 0.9, [
+            _evidence(func, repoint, f"`{_src(repoint)}` points a node back"),
+            _evidence(func, advance, f"`{_src(advance)}` advances through the list"),
+        ], 'Reverses links in place while walking the list once')
+    return None
+
+
+def _detect_merge_intervals(func: ast.AST) -> Optional[Dict]:
+    """Sort by interval start, then compare with the last merged end"""
+    sort = None
+    for call in ast.walk(func):
+        if not isinstance(call, ast.Call) or _call_name(call) not in ('sorted',) and not (
+                isinstance(call.func, ast.Attribute) and call.func.attr == 'sort'):
+            continue
+        for keyword in call.keywords:
+            if (keyword.arg == 'key' and isinstance(keyword.value, ast.Lambda)
+                    and isinstance(keyword.value.body, ast.Subscript)
+                    and isinstance(keyword.value.body.slice, ast.Constant)
+                    and keyword.value.body.slice.value == 0):
+                sort = call
+    if not sort:
+        return None
+    for node in ast.walk(func):
+        if (isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant)
+                and node.slice.value == 1 and isinstance(node.value, ast.Subscript)
+                and isinstance(node.value.slice, ast.UnaryOp)):
+            return _pattern('Merge Intervals', 0.9, [
+                _evidence(func, sort, f"`{_src(sort)}` orders intervals by start"),
+                _evidence(func, node, f"`{_src(node)}` extends the last merged interval"),
+            ], 'Sorts intervals by start and merges overlaps with the previous interval')
+    return None
+
+
+def _detect_divide_and_conquer(func: ast.AST) -> Optional[Dict]:
+    """Two or more recursive calls on halves of the input"""
+    calls = _self_calls(func)
+    halves = []
+    for call in calls:
+        for arg in call.args:
+            if isinstance(arg, ast.Subscript) and isinstance(arg.slice, ast.Slice):
+                halves.append(call)
+                break
+            if _name(arg) and 'mid' in arg.id:
+                halves.append(call)
+                break
+            if isinstance(arg, ast.BinOp) and any('mid' in (_name(n) or '') for n in ast.walk(arg)):
+                halves.append(call)
+                break
+    if len(halves) >= 2:
+        return _pattern('Divide and Conquer', 0.9,
+                        [_evidence(func, call, f"recurses on `{_src(call)}`") for call in halves[:2]],
+                        'Splits the input, solves each part recursively and combines the results')
+    return None
+
+
+_DETECTORS = [
+    _detect_binary_search,
+    _detect_two_pointers,
+    _detect_sliding_window,
+    _detect_fast_slow,
+    _detect_monotonic,
+    _detect_heap,
+    _detect_topological_sort,
+    _detect_bfs,
+    _detect_dfs,
+    _detect_dynamic_programming,
+    _detect_backtracking,
+    _detect_cyclic_sort,
+    _detect_linked_list_reversal,
+    _detect_merge_intervals,
+    _detect_divide_and_conquer,
+]
+
+
+def _is_straight_line(func: ast.AST) -> bool:
+    """Functions without loops, comprehensions or recursion have no algorithmic pattern"""
+    return not _self_calls(func) and not any(
+        isinstance(node, _LOOPS + (ast.comprehension,)) for node in ast.walk(func))
+
+
+def _module_scope(tree: ast.Module) -> Optional[ast.FunctionDef]:
+    """
+    Module-level statements outside any function, wrapped as a pseudo-function
+
+    Pasted snippets often run their algorithm at module level; wrapping those
+    statements lets the detectors inspect them like any other scope.
+    """
+    body = [node for node in tree.body
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                                     ast.Import, ast.ImportFrom))]
+    if not body:
+        return None
+    return ast.FunctionDef(name='<module>', body=body, decorator_list=[], returns=None,
+                           args=ast.arguments(posonlyargs=[], args=[], vararg=None,
+                                              kwonlyargs=[], kw_defaults=[], kwarg=None,
+                                              defaults=[]),
+                           lineno=body[0].lineno, col_offset=0)
+
+
+def top_level_functions(tree: ast.AST) -> List[ast.AST]:
+    """Module-level functions and class methods, excluding nested helpers"""
+    functions = []
+    for node in getattr(tree, 'body', []):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node)
+        elif isinstance(node, ast.ClassDef):
+            functions.extend(top_level_functions(node))
+    return functions
+
+
+def detect_data_structures(tree: ast.AST) -> List[Dict]:
+    """Identify the data structures the code relies on"""
+    found = {}
+
+    def add(structure: str, usage: str, efficiency: str):
+        found.setdefault(structure, {'structure': structure, 'usage': usage,
+                                     'efficiency': efficiency})
+
+    call_names = {(_call_name(node) or '').split('.')[-1] for node in ast.walk(tree)}
+    attributes = {node.attr for node in ast.walk(tree) if isinstance(node, ast.Attribute)}
+    if 'deque' in call_names:
+        add('Deque', 'Queue with O(1) appends and pops at both ends',
+            'Avoids the O(n) cost of list.pop(0)')
+    if call_names & {'heappush', 'heappop', 'heapify', 'nlargest', 'nsmallest'}:
+        add('Heap', 'Priority queue via heapq', 'O(log n) push/pop with O(1) access to the minimum')
+    if any(isinstance(node, (ast.Dict, ast.DictComp)) for node in ast.walk(tree)) or \
+            call_names & {'dict', 'defaultdict', 'Counter'}:
+        add('Hash Map', 'Key-value lookups', 'O(1) average insert and lookup')
+    if any(isinstance(node, (ast.Set, ast.SetComp)) for node in ast.walk(tree)) or 'set' in call_names:
+        add('Hash Set', 'Membership checks', 'O(1) average membership tests')
+    if 'next' in attributes:
+        add('Linked List', 'Nodes linked through .next', 'O(1) relinking, O(n) access by position')
+    if {'left', 'right'} <= attributes:
+        add('Binary Tree', 'Nodes with .left/.right children', 'O(h) operations for tree height h')
+    if 'pop' in attributes and 'append' in attributes and 'deque' not in call_names:
+        add('Stack', 'List used with append/pop', 'O(1) push and pop at the end')
+    if any(isinstance(node, (ast.List, ast.ListComp)) for node in ast.walk(tree)) or \
+            any(isinstance(node, ast.Subscript) for node in ast.walk(tree)):
+        add('Array', 'Indexed sequence', 'O(1) random access')
+    return list(found.values())
+
+
+def match_patterns(code: str) -> Optional[Dict]:
+    """
+    Run the local rule engine over every function in the code
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Dictionary in the detect_patterns_with_gemini schema plus
+        'unclassified' (functions without a confident match, with '<module>'
+        standing for code outside any function), or None if the code does
+        not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    patterns: Dict[str, Dict] = {}
+    unclassified = []
+    module = _module_scope(tree)
+    for func in top_level_functions(tree) + ([module] if module else []):
+        # Nested helpers (e.g. a closure doing the recursion) count toward their parent
+        scopes = [node for node in ast.walk(func)
+                  if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        matches = [match for scope in scopes for match in
+                   (detector(scope) for detector in _DETECTORS) if match]
+        if not any(match['confidence'] >= LOCAL_PATTERN_THRESHOLD for match in matches) \
+                and not _is_straight_line(func):
+            unclassified.append(func.name)
+        for match in matches:
+            merged = patterns.get(match['pattern_name'])
+            if merged is None:
+                patterns[match['pattern_name']] = match
+            else:
+                merged['confidence'] = max(merged['confidence'], match['confidence'])
+                merged['evidence'] += match['evidence']
+
+    ordered = sorted(patterns.values(), key=lambda p: -p['confidence'])
+    algorithm_types = []
+    for pattern in ordered:
+        kind = ALGORITHM_TYPES.get(pattern['pattern_name'])
+        if kind and kind not in algorithm_types:
+            algorithm_types.append(kind)
+    return {
+        'patterns': ordered,
+        'data_structures': detect_data_structures(tree),
+        'algorithm_type': ', '.join(algorithm_types) or 'Straight-line code',
+        'coding_techniques': [pattern['pattern_name'] for pattern in ordered],
+        'unclassified': unclassified,
+        'source': 'local',
+    }
+
+
+def detect_patterns_locally(code: str) -> Optional[Dict]:
+    """
+    Classify code without calling Gemini when every function matches confidently
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Pattern detection results, or None if any function needs Gemini
+    """
+    results = match_patterns(code)
+    if results is None or results.pop('unclassified'):
+        return None
+    return results
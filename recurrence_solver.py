@@ -0,0 +1,526 @@
+"""
+Local Recurrence Solver
+Derives T(n) = a*T(n/b) + f(n) style recurrences from recursive functions and
+solves them with the Master theorem, Akra-Bazzi or the characteristic
+equation, accounting for memoization
+"""
+
+import ast
+import math
+from typing import Dict, List, Optional, Tuple
+
+from pattern_matcher import top_level_functions
+
+# Builtins that walk their whole (single) argument
+_LINEAR_BUILTINS = {'sum', 'min', 'max', 'list', 'set', 'dict', 'tuple', 'reversed',
+                    'any', 'all', 'enumerate', 'zip', 'join', 'copy', 'count', 'index'}
+_MEMO_DECORATORS = {'lru_cache', 'cache'}
+
+_EPSILON = 1e-9
+
+# A shrink is ('sub', c) for T(n - c), ('div', b) for T(n / b) or
+# ('partition', 2) for a data-dependent split that halves on average
+Shrink = Tuple[str, float]
+# Work outside the recursive calls, as (polynomial degree, log power)
+Work = Tuple[float, int]
+
+
+def _calls_to(node: ast.AST, name: str) -> List[ast.Call]:
+    """Calls of `name(...)` or `self.name(...)` inside node"""
+    calls = []
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Call):
+            continue
+        func = child.func
+        if isinstance(func, ast.Name) and func.id == name:
+            calls.append(child)
+        elif (isinstance(func, ast.Attribute) and func.attr == name
+              and isinstance(func.value, ast.Name) and func.value.id == 'self'):
+            calls.append(child)
+    return calls
+
+
+def _fraction_names(func: ast.AST) -> Dict[str, float]:
+    """Names assigned a fraction of the input, e.g. `mid = (lo + hi) // 2` or `t = len(arr) // 3`"""
+    names = {}
+    for node in ast.walk(func):
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)):
+            continue
+        for sub in ast.walk(node.value):
+            if not (isinstance(sub, ast.BinOp) and isinstance(sub.right, ast.Constant)
+                    and isinstance(sub.right.value, int)):
+                continue
+            if isinstance(sub.op, ast.FloorDiv) and sub.right.value > 1:
+                names[node.targets[0].id] = float(sub.right.value)
+            elif isinstance(sub.op, ast.RShift) and sub.right.value > 0:
+                names[node.targets[0].id] = float(2 ** sub.right.value)
+    return names
+
+
+def _partition_names(func: ast.AST, params: set) -> set:
+    """Names built by filtering a parameter, e.g. `left = [x for x in arr if x < pivot]`"""
+    names = set()
+    for node in ast.walk(func):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and isinstance(node.value, ast.ListComp)
+                and any(gen.ifs and isinstance(gen.iter, ast.Name) and gen.iter.id in params
+                        for gen in node.value.generators)):
+            names.add(node.targets[0].id)
+    return names
+
+
+def _classify_argument(arg: ast.AST, params: set, fractions: Dict[str, float],
+                       partitions: set) -> Optional[Shrink]:
+    """How an argument of a recursive call shrinks the input, if it does"""
+    names = {node.id for node in ast.walk(arg) if isinstance(node, ast.Name)}
+    if isinstance(arg, ast.BinOp) and isinstance(arg.left, ast.Name) and arg.left.id in params \
+            and isinstance(arg.right, ast.Constant) and isinstance(arg.right.value, (int, float)):
+        if isinstance(arg.op, ast.Sub) and arg.right.value > 0:
+            return ('sub', arg.right.value)
+        if isinstance(arg.op, (ast.FloorDiv, ast.Div)) and arg.right.value > 1:
+            return ('div', arg.right.value)
+        if isinstance(arg.op, ast.RShift) and arg.right.value > 0:
+            return ('div', 2 ** arg.right.value)
+    if isinstance(arg, ast.Subscript) and isinstance(arg.slice, ast.Slice) \
+            and isinstance(arg.value, ast.Name) and arg.value.id in params:
+        lower, upper = arg.slice.lower, arg.slice.upper
+        # arr[:t] keeps n/c elements, arr[t:] keeps the remaining n(c-1)/c
+        if isinstance(upper, ast.Name) and upper.id in fractions and lower is None:
+            return ('div', fractions[upper.id])
+        if isinstance(lower, ast.Name) and lower.id in fractions and upper is None:
+            c = fractions[lower.id]
+            return ('div', c / (c - 1))
+        bound_names = {node.id for bound in (lower, upper) if bound
+                       for node in ast.walk(bound) if isinstance(node, ast.Name)}
+        if bound_names & set(fractions):
+            return ('div', 2)
+        if (lower or upper) and not bound_names:
+            return ('sub', 1)
+    if names & set(fractions):
+        return ('div', 2)
+    if isinstance(arg, ast.Name) and arg.id in partitions:
+        return ('partition', 2)
+    return None
+
+
+def _call_shrink(call: ast.Call, params: List[str], fractions: Dict[str, float],
+                 partitions: set) -> Optional[Shrink]:
+    """The shrink of the first argument that reduces the input size"""
+    for arg in call.args:
+        shrink = _classify_argument(arg, set(params), fractions, partitions)
+        if shrink:
+            return shrink
+    return None
+
+
+def _shrinking_params(calls: List[ast.Call], params: List[str], fractions: Dict[str, float],
+                      partitions: set) -> set:
+    """
+    Parameters passed a reduced value by at least one of the calls, including
+    steps the solver cannot size such as the `w - wt[i]` of a knapsack
+    """
+    shrinking = set()
+    for call in calls:
+        for param, arg in zip(params, call.args):
+            reduced = (isinstance(arg, ast.BinOp)
+                       and isinstance(arg.op, (ast.Sub, ast.Div, ast.FloorDiv, ast.RShift))
+                       and isinstance(arg.left, ast.Name) and arg.left.id == param)
+            if reduced or _classify_argument(arg, set(params), fractions, partitions):
+                shrinking.add(param)
+    return shrinking
+
+
+def _terminates(stmts: List[ast.AST]) -> bool:
+    """Whether a block always ends by returning or raising"""
+    return bool(stmts) and isinstance(stmts[-1], (ast.Return, ast.Raise))
+
+
+def _calls_per_invocation(stmts: List[ast.AST], name: str) -> Optional[List[ast.Call]]:
+    """
+    Recursive calls made on the most expensive path through a block
+
+    Calls in mutually exclusive branches are not added together. Returns None
+    when a call sits inside a loop, since the branching factor is unknown.
+    """
+    calls: List[ast.Call] = []
+    for position, stmt in enumerate(stmts):
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(stmt, ast.If) and _terminates(stmt.body):
+            # `if ...: return f(...)` excludes everything after it
+            body = _calls_per_invocation(stmt.body, name)
+            rest = _calls_per_invocation(stmt.orelse + stmts[position + 1:], name)
+            if body is None or rest is None:
+                return None
+            return calls + _calls_to(stmt.test, name) + max(body, rest, key=len)
+        if isinstance(stmt, (ast.For, ast.AsyncFor, ast.While)):
+            if _calls_to(stmt, name):
+                return None
+            continue
+        if isinstance(stmt, ast.If):
+            test_calls = _calls_to(stmt.test, name)
+            body = _calls_per_invocation(stmt.body, name)
+            orelse = _calls_per_invocation(stmt.orelse, name)
+            if body is None or orelse is None:
+                return None
+            calls += test_calls + max(body, orelse, key=len)
+            continue
+        if isinstance(stmt, (ast.Try, ast.With)):
+            inner = _calls_per_invocation(getattr(stmt, 'body', []), name)
+            if inner is None:
+                return None
+            calls += inner
+            continue
+        for node in ast.walk(stmt):
+            if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)) \
+                    and _calls_to(node, name):
+                return None
+        branches = [node for node in ast.walk(stmt) if isinstance(node, ast.IfExp)]
+        exclusive = set()
+        for branch in branches:
+            body, orelse = _calls_to(branch.body, name), _calls_to(branch.orelse, name)
+            exclusive.update(id(call) for call in min(body, orelse, key=len))
+        calls += [call for call in _calls_to(stmt, name) if id(call) not in exclusive]
+        if isinstance(stmt, (ast.Return, ast.Raise)):
+            break
+    return calls
+
+
+def _loop_depth(node: ast.AST, depth: int = 0) -> int:
+    """Deepest nesting of loops and comprehensions, ignoring nested functions"""
+    if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.comprehension)):
+        depth += 1
+    deepest = depth
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        deepest = max(deepest, _loop_depth(child, depth))
+    return deepest
+
+
+def _helper_work(tree: ast.AST) -> Dict[str, Work]:
+    """Cost of the non-recursive module functions, from their loop depth"""
+    work = {}
+    for func in top_level_functions(tree):
+        if not _calls_to(func, func.name):
+            work[func.name] = (float(_loop_depth(func)), 0)
+    return work
+
+
+def _derived_names(func: ast.AST, sources: set) -> set:
+    """Names whose values are computed from the given names, including the names"""
+    derived = set(sources)
+    changed = True
+    while changed:
+        changed = False
+        for node in ast.walk(func):
+            if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+                value = node.value
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+                value, targets = node.iter, [node.target]
+            else:
+                continue
+            if value is None or not _names_in(value) & derived:
+                continue
+            new = {name for target in targets for name in _names_in(target)} - derived
+            if new:
+                derived |= new
+                changed = True
+    return derived
+
+
+def _names_in(node: ast.AST) -> set:
+    """Every name referenced in an expression"""
+    return {child.id for child in ast.walk(node) if isinstance(child, ast.Name)}
+
+
+def _unrelated_loops(func: ast.AST, sizes: set) -> List[ast.AST]:
+    """
+    Loops whose bounds do not involve the input the recursion shrinks; their
+    cost is in some other size (O(n·k)), which a single n cannot express
+    """
+    loops = []
+    for node in ast.walk(func):
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+            bound = node.iter
+        elif isinstance(node, ast.While):
+            bound = node.test
+        else:
+            continue
+        if not _names_in(bound) & sizes:
+            loops.append(node)
+    return loops
+
+
+def _local_work(func: ast.AST, helpers: Dict[str, Work]) -> Tuple[Work, List[str]]:
+    """Work done by one invocation outside its recursive calls"""
+    work: Work = (float(_loop_depth(func)), 0)
+    notes = []
+    if work[0]:
+        notes.append(f"loops nested {int(work[0])} deep")
+
+    def bump(candidate: Work, note: str):
+        nonlocal work
+        if candidate > work:
+            work = candidate
+            notes.append(note)
+
+    for node in ast.walk(func):
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            bump((1.0, 0), f"slicing `{ast.unparse(node)}` copies O(n) elements")
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add) and (
+                isinstance(node.left, ast.List) or isinstance(node.right, ast.List)):
+            bump((1.0, 0), f"list concatenation `{ast.unparse(node)}` is O(n)")
+        elif isinstance(node, ast.Call):
+            callee = node.func.id if isinstance(node.func, ast.Name) else (
+                node.func.attr if isinstance(node.func, ast.Attribute) else None)
+            if callee == func.name:
+                continue
+            if callee in ('sorted', 'sort'):
+                bump((1.0, 1), f"`{ast.unparse(node)}` sorts in O(n log n)")
+            elif callee in _LINEAR_BUILTINS and len(node.args) == 1 \
+                    and not isinstance(node.args[0], ast.Constant):
+                bump((1.0, 0), f"`{ast.unparse(node)}` walks its argument")
+            elif callee in helpers and helpers[callee][0] > 0:
+                bump(helpers[callee], f"helper `{callee}` costs {_format_work(helpers[callee])}")
+    return work, notes
+
+
+def _is_memoized(func: ast.AST) -> Optional[str]:
+    """Describe how the function is memoized, if it is"""
+    for decorator in func.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        label = target.attr if isinstance(target, ast.Attribute) else getattr(target, 'id', None)
+        if label in _MEMO_DECORATORS:
+            return f"@{label}"
+    for node in ast.walk(func):
+        if (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+                and isinstance(node.test.ops[0], ast.In)
+                and any(isinstance(stmt, ast.Return) for stmt in node.body)):
+            cache = ast.unparse(node.test.comparators[0])
+            stored = any(isinstance(target, ast.Subscript) and ast.unparse(target.value) == cache
+                         for assign in ast.walk(func) if isinstance(assign, ast.Assign)
+                         for target in assign.targets)
+            if stored:
+                return f"the {cache} cache"
+    return None
+
+
+def _format_power(exponent: float) -> str:
+    """Format n^exponent"""
+    if abs(exponent) < _EPSILON:
+        return ''
+    if abs(exponent - 1) < _EPSILON:
+        return 'n'
+    if abs(exponent - round(exponent)) < _EPSILON:
+        return f"n^{int(round(exponent))}"
+    return f"n^{exponent:.2f}"
+
+
+def _format_work(work: Work) -> str:
+    """Format a (degree, log power) pair as Big-O"""
+    degree, logs = work
+    parts = [_format_power(degree)]
+    if logs == 1:
+        parts.append('log n')
+    elif logs > 1:
+        parts.append(f"log^{logs} n")
+    body = ' '.join(part for part in parts if part)
+    return f"O({body or '1'})"
+
+
+def _solve_divide(shrinks: List[Shrink], work: Work) -> Tuple[str, List[str]]:
+    """Master theorem (equal splits) or Akra-Bazzi (unequal splits)"""
+    factors = [b for _, b in shrinks]
+    a = len(factors)
+    if len(set(factors)) == 1:
+        b = factors[0]
+        p = math.log(a, b)
+        method = f"Master theorem with a={a}, b={b:g}: log_b(a) = {p:.2f}"
+    else:
+        # Solve sum(b_i^-p) = 1 for p by bisection
+        low, high = -10.0, 10.0
+        for _ in range(100):
+            mid = (low + high) / 2
+            if sum(b ** -mid for b in factors) > 1:
+                low = mid
+            else:
+                high = mid
+        p = (low + high) / 2
+        method = f"Akra-Bazzi: sum of (1/b_i)^p = 1 gives p = {p:.2f}"
+
+    degree, logs = work
+    if degree < p - _EPSILON:
+        result: Work = (p, 0)
+        reason = f"the recursion dominates since f(n) = {_format_work(work)} grows slower than n^{p:.2f}"
+    elif abs(degree - p) < _EPSILON:
+        result = (p, logs + 1)
+        reason = f"f(n) = {_format_work(work)} matches n^{p:.2f}, adding a log factor"
+    else:
+        result = work
+        reason = f"f(n) = {_format_work(work)} dominates the recursion"
+    return _format_work(result), [method, reason]
+
+
+def _solve_subtract(shrinks: List[Shrink], work: Work) -> Tuple[str, List[str]]:
+    """Linear recurrences T(n) = sum T(n - c_i) + f(n)"""
+    steps = [c for _, c in shrinks]
+    if len(steps) == 1:
+        c = steps[0]
+        result = _format_work((work[0] + 1, work[1]))
+        chain = 'n' if c == 1 else f"n/{c:g}"
+        return result, [f"A chain of {chain} calls, each doing {_format_work(work)} work"]
+
+    # Growth rate r is the largest root of sum(r^-c_i) = 1
+    low, high = 1.0, float(len(steps)) + 1
+    for _ in range(100):
+        mid = (low + high) / 2
+        if sum(mid ** -c for c in steps) > 1:
+            low = mid
+        else:
+            high = mid
+    rate = (low + high) / 2
+    shortest = min(steps)
+    base = len(steps)
+    bound = f"O({base}^n)" if shortest == 1 else f"O({base}^(n/{shortest:g}))"
+    return bound, [
+        f"{base} recursive calls per level shrinking by {', '.join(f'{c:g}' for c in steps)}",
+        f"Characteristic equation gives growth Θ({rate:.3f}^n), bounded by {bound}",
+    ]
+
+
+def _recurrence_text(shrinks: List[Shrink], work: Work) -> str:
+    """Human-readable recurrence"""
+    terms = {}
+    for kind, value in shrinks:
+        term = f"T(n-{value:g})" if kind == 'sub' else f"T(n/{value:.3g})"
+        terms[term] = terms.get(term, 0) + 1
+    calls = ' + '.join(f"{count}{term}" if count > 1 else term for term, count in terms.items())
+    return f"T(n) = {calls} + {_format_work(work)}"
+
+
+def solve_function(func: ast.AST, helpers: Optional[Dict[str, Work]] = None) -> Optional[Dict]:
+    """
+    Build and solve the recurrence of one recursive function
+
+    Args:
+        func: FunctionDef node
+        helpers: Costs of other module functions it may call
+
+    Returns:
+        Entry in the analyze_complexity_with_gemini schema, or None if the
+        function is not recursive or its recurrence cannot be derived
+    """
+    helpers = helpers or {}
+    if not _calls_to(func, func.name):
+        return None
+    calls = _calls_per_invocation(func.body, func.name)
+    if not calls:
+        return None
+
+    params = [arg.arg for arg in func.args.args if arg.arg != 'self']
+    fractions = _fraction_names(func)
+    partitions = _partition_names(func, set(params))
+    shrinks = [_call_shrink(call, params, fractions, partitions) for call in calls]
+    if any(shrink is None for shrink in shrinks):
+        return None
+
+    shrinking = _shrinking_params(calls, params, fractions, partitions)
+    if _unrelated_loops(func, _derived_names(func, shrinking)):
+        return None
+
+    work, work_notes = _local_work(func, helpers)
+    kinds = {kind for kind, _ in shrinks}
+    memo = _is_memoized(func)
+    reasoning = []
+    confidence = 'high'
+    best_case = None
+    worst_case = None
+
+    if memo:
+        # Every distinct argument is solved once; a table over several shrinking
+        # arguments (knapsack, LCS) is O(n·m), which one size n cannot express
+        if len(shrinking) > 1:
+            return None
+        if kinds <= {'sub'}:
+            states: Work = (1.0, 0)
+        elif kinds <= {'div'}:
+            states = (0.0, 1)
+        else:
+            return None
+        time_work = (states[0] + work[0], states[1] + work[1])
+        time_complexity = _format_work(time_work)
+        space_complexity = _format_work(max(states, (0.0, 1)))
+        reasoning.append(f"Memoized via {memo}: {_format_work(states)} distinct subproblems "
+                         f"× {_format_work(work)} work each")
+        reasoning.append(f"Without memoization: {_recurrence_text(shrinks, work)}")
+    elif kinds == {'sub'}:
+        time_complexity, notes = _solve_subtract(shrinks, work)
+        reasoning += [f"Recurrence: {_recurrence_text(shrinks, work)}"] + notes
+        depth = (1.0, 0)
+        copies = any(isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice)
+                     for node in ast.walk(func))
+        space_complexity = _format_work((2.0, 0) if copies else depth)
+    elif kinds <= {'div', 'partition'}:
+        time_complexity, notes = _solve_divide([('div', b) for _, b in shrinks], work)
+        reasoning += [f"Recurrence: {_recurrence_text([('div', b) for _, b in shrinks], work)}"]
+        reasoning += notes
+        builds_lists = work[0] >= 1 and any(
+            isinstance(node, (ast.List, ast.ListComp, ast.Subscript)) for node in ast.walk(func))
+        space_complexity = 'O(n)' if builds_lists else 'O(log n)'
+        if 'partition' in kinds:
+            confidence = 'medium'
+            # Average case assumes balanced splits; the worst case peels one element per level
+            worst_case, _ = _solve_subtract([('sub', 1)], work)
+            reasoning.append(f"Assumes balanced partitions on average; a bad pivot every time "
+                             f"degrades to {worst_case}")
+            space_complexity = 'O(n)'
+    else:
+        return None
+
+    if work_notes:
+        reasoning.append(f"Work per call: {', '.join(work_notes)}")
+    if helpers and any(note.startswith('helper') for note in work_notes):
+        confidence = 'medium' if confidence == 'high' else confidence
+    best_case = best_case or time_complexity
+
+    return {
+        'name': func.name,
+        'time_complexity': time_complexity,
+        'space_complexity': space_complexity,
+        'confidence': confidence,
+        'reasoning': reasoning,
+        'best_case': best_case,
+        'average_case': time_complexity,
+        'worst_case': worst_case or time_complexity,
+        'optimization_suggestions': [] if memo or kinds != {'sub'} or len(shrinks) < 2 else [
+            "Overlapping subproblems: memoize with functools.lru_cache or iterate bottom-up"
+        ],
+        'source': 'recurrence',
+    }
+
+
+def solve_recursive_functions(code: str) -> Dict[str, Dict]:
+    """
+    Solve the recurrences of every recursive top-level function
+
+    Args:
+        code: The code to analyze
+
+    Returns:
+        Map of function name to its complexity entry, for the recursive
+        functions whose recurrence could be derived
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+    helpers = _helper_work(tree)
+    solved = {}
+    for func in top_level_functions(tree):
+        entry = solve_function(func, helpers)
+        if entry:
+            solved[func.name] = entry
+    return solved
@@ -0,0 +1,440 @@
+"""
+Persistent Result Store
+Keeps analysis results in an indexed local SQLite database so they can be
+queried later without calling Gemini again
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DB_PATH = os.getenv('CODE_SENSEI_DB', '.code_sensei.db')
+
+# Complexity classes from cheapest to most expensive
+COMPLEXITY_CLASSES = [
+    'O(1)',
+    'O(log n)',
+    'O(sqrt n)',
+    'O(n)',
+    'O(n log n)',
+    'O(n^2)',
+    'O(n^3+)',
+    'O(2^n)',
+    'O(n!)',
+]
+
+CONFIDENCE_LEVELS = ['low', 'medium', 'high']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS functions (
+    file TEXT NOT NULL,
+    function TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    time_complexity TEXT,
+    space_complexity TEXT,
+    complexity_rank INTEGER,
+    confidence TEXT,
+    result TEXT,
+    analyzed_at TEXT NOT NULL,
+    PRIMARY KEY (file, function, fingerprint, commit_sha)
+);
+CREATE INDEX IF NOT EXISTS idx_functions_rank ON functions (complexity_rank);
+CREATE INDEX IF NOT EXISTS idx_functions_confidence ON functions (confidence);
+CREATE INDEX IF NOT EXISTS idx_functions_date ON functions (analyzed_at);
+
+CREATE TABLE IF NOT EXISTS patterns (
+    file TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    pattern_name TEXT NOT NULL COLLATE NOCASE,
+    confidence REAL,
+    result TEXT,
+    analyzed_at TEXT NOT NULL,
+    PRIMARY KEY (file, fingerprint, commit_sha, pattern_name)
+);
+CREATE INDEX IF NOT EXISTS idx_patterns_name ON patterns (pattern_name);
+CREATE INDEX IF NOT EXISTS idx_patterns_date ON patterns (analyzed_at);
+
+CREATE TABLE IF NOT EXISTS latencies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    seconds REAL NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+"""
+
+# Latency samples kept for the hedging p95
+LATENCY_HISTORY = 1000
+
+
+def _term_order(term: str) -> tuple:
+    """Return (polynomial degree, number of log factors) for one additive term"""
+    logs = len(re.findall(r'log|\b(?:lg|ln)\b', term))
+    term = re.sub(r'(?:(?:log\w*|\b(?:lg|ln)\b)(?:\^\d+)?\s*)+(\([^)]*\)|[a-z_]\w*)?', ' ', term)
+    degree = 0.0
+    for match in re.finditer(r'sqrt\s*\(?\s*[a-z_]\w*\s*\)?', term):
+        degree += 0.5
+        term = term.replace(match.group(0), ' ')
+    # A symbolic exponent such as n^k is some fixed but unknown polynomial degree
+    for match in re.finditer(r'[a-z_]\w*\s*\^\s*\(?\s*[a-z_]\w*\s*\)?', term):
+        degree += 3.0
+        term = term.replace(match.group(0), ' ')
+    for match in re.finditer(r'[a-z_]\w*(\^\(?(\d+(\.\d+)?)\)?)?', term):
+        if match.group(2):
+            degree += float(match.group(2))
+        else:
+            # Two-letter names like nm or vk are products of single-letter sizes
+            name = match.group(0)
+            degree += 2.0 if len(name) == 2 and name.isalpha() else 1.0
+    return degree, logs
+
+
+def complexity_rank(notation: Optional[str]) -> Optional[int]:
+    """
+    Map a Big-O string onto an index into COMPLEXITY_CLASSES
+
+    Args:
+        notation: A complexity such as "O(n log n)" or "O(V + E)"
+
+    Returns:
+        The class index, or None if the notation cannot be understood
+    """
+    if not notation:
+        return None
+    text = notation.lower().replace('²', '^2').replace('³', '^3').replace('**', '^')
+    text = text.replace('√', 'sqrt').replace('·', '*').replace('×', '*').replace('φ', 'phi')
+    match = re.search(r'o\s*\(((?:[^()]|\([^()]*\))*)\)', text)
+    if not match:
+        return None
+    body = re.sub(r'len\s*\(\s*\w+\s*\)', 'n', match.group(1))
+    if '!' in body or 'factorial' in body:
+        return COMPLEXITY_CLASSES.index('O(n!)')
+    # Only a constant base raised to a size is exponential; n^k is a polynomial
+    if re.search(r'(?<![\w.])(\d+(\.\d+)?|phi|e)\s*\^\s*\(?\s*[a-z_]', body):
+        return COMPLEXITY_CLASSES.index('O(2^n)')
+
+    # max(a, b) and min(a, b) grow like a + b
+    body = re.sub(r'\b(max|min)\s*\(', '(', body).replace(',', '+')
+    degree, logs = max(_term_order(term) for term in body.split('+'))
+    if degree == 0:
+        return COMPLEXITY_CLASSES.index('O(log n)' if logs else 'O(1)')
+    if degree < 1:
+        return COMPLEXITY_CLASSES.index('O(sqrt n)')
+    if degree == 1:
+        return COMPLEXITY_CLASSES.index('O(n log n)' if logs else 'O(n)')
+    if degree <= 2:
+        return COMPLEXITY_CLASSES.index('O(n^2)')
+    return COMPLEXITY_CLASSES.index('O(n^3+)')
+
+
+def code_fingerprint(code: str) -> str:
+    """
+    Fingerprint code so formatting and comment changes do not create new rows
+
+    Args:
+        code: The code to fingerprint
+
+    Returns:
+        A short hex digest of the normalized AST (or the stripped text if
+        the code does not parse)
+    """
+    try:
+        normalized = ast.dump(ast.parse(code))
+    except SyntaxError:
+        normalized = code.strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _function_sources(code: str) -> Dict[str, str]:
+    """Map function names (including Class.method) to their source, decorators included"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+    sources = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    sources[f"{node.name}.{item.name}"] = ast.unparse(item)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            sources.setdefault(node.name, ast.unparse(node))
+    return sources
+
+
+def current_commit(filepath: str) -> str:
+    """
+    Get the git commit the file was analyzed at
+
+    Args:
+        filepath: Path of the analyzed file
+
+    Returns:
+        The HEAD commit hash, or an empty string outside a git repository
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=Path(filepath).resolve().parent,
+            capture_output=True, text=True, timeout=5, check=False
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return result.stdout.strip() if result.returncode == 0 else ''
+
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """Open the result store, creating the schema if needed"""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def store_results(filepath: str, code: str, complexity: Optional[Dict] = None,
+                  patterns: Optional[Dict] = None, db_path: Optional[str] = None,
+                  commit: Optional[str] = None):
+    """
+    Persist complexity and pattern results for a file
+
+    Args:
+        filepath: Path of the analyzed file
+        code: The analyzed code
+        complexity: Result of analyze_complexity_with_gemini
+        patterns: Result of detect_patterns_with_gemini
+        db_path: Database path, defaults to DB_PATH
+        commit: Commit hash, looked up with git when not given
+    """
+    if not complexity and not patterns:
+        return
+
+    file_key = str(Path(filepath).resolve())
+    commit = current_commit(filepath) if commit is None else commit
+    file_fingerprint = code_fingerprint(code)
+    sources = _function_sources(code)
+    analyzed_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    with connect(db_path) as conn:
+        for func in (complexity or {}).get('functions', []):
+            name = func.get('name', '')
+            source = sources.get(name)
+            conn.execute(
+                "INSERT OR REPLACE INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_key, name,
+                 code_fingerprint(source) if source else file_fingerprint,
+                 commit,
+                 func.get('time_complexity'),
+                 func.get('space_complexity'),
+                 complexity_rank(func.get('time_complexity')),
+                 str(func.get('confidence', '')).lower(),
+                 json.dumps(func),
+                 analyzed_at)
+            )
+        for pattern in (patterns or {}).get('patterns', []):
+            conn.execute(
+                "INSERT OR REPLACE INTO patterns VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_key, file_fingerprint, commit,
+                 pattern.get('pattern_name', ''),
+                 pattern.get('confidence'),
+                 json.dumps(pattern),
+                 analyzed_at)
+            )
+    conn.close()
+
+
+def _common_filters(alias: str, clauses: List[str], params: List, since: Optional[str],
+                    until: Optional[str], file: Optional[str]) -> tuple:
+    """Append the date and file filters shared by both queries"""
+    if since:
+        clauses.append(f"{alias}.analyzed_at >= ?")
+        params.append(since)
+    if until:
+        # Dates without a time should include the whole day
+        clauses.append(f"{alias}.analyzed_at <= ?")
+        params.append(until if 'T' in until else f"{until}T23:59:59")
+    if file:
+        clauses.append(f"{alias}.file LIKE ?")
+        params.append(f"%{file}%")
+    return clauses, params
+
+
+def query_functions(complexity: Optional[str] = None, at_least: bool = False,
+                    pattern: Optional[str] = None, confidence: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None,
+                    file: Optional[str] = None, history: bool = False,
+                    db_path: Optional[str] = None) -> List[Dict]:
+    """
+    Query stored function analyses
+
+    Only the latest analysis of each function is considered, so a function
+    rewritten since an earlier analysis is matched by its current result.
+
+    Args:
+        complexity: Complexity class to match, e.g. "O(n^2)"
+        at_least: Match the given class or anything more expensive
+        pattern: Only functions in files where this pattern was detected
+        confidence: Only results with this confidence (high/medium/low)
+        since: Only results analyzed on or after this ISO date
+        until: Only results analyzed on or before this ISO date
+        file: Only results whose path contains this substring
+        history: Also match earlier analyses of each function
+        db_path: Database path, defaults to DB_PATH
+
+    Returns:
+        Matching rows as dictionaries, most expensive first
+    """
+    clauses, params = [], []
+    if not history:
+        clauses.append(
+            "f.rowid = (SELECT g.rowid FROM functions g WHERE g.file = f.file"
+            " AND g.function = f.function ORDER BY g.analyzed_at DESC, g.rowid DESC LIMIT 1)"
+        )
+    if complexity:
+        rank = complexity_rank(complexity)
+        if rank is None:
+            raise ValueError(f"Unrecognized complexity class: {complexity}")
+        clauses.append("f.complexity_rank >= ?" if at_least else "f.complexity_rank = ?")
+        params.append(rank)
+    if pattern:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM patterns p WHERE p.file = f.file"
+            " AND p.commit_sha = f.commit_sha AND p.pattern_name = ?)"
+        )
+        params.append(pattern)
+    if confidence:
+        clauses.append("f.confidence = ?")
+        params.append(confidence.lower())
+    clauses, params = _common_filters('f', clauses, params, since, until, file)
+
+    sql = ("SELECT f.file, f.function, f.time_complexity, f.space_complexity, f.confidence,"
+           " f.commit_sha, f.analyzed_at FROM functions f")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY f.complexity_rank DESC, f.file, f.function"
+
+    conn = connect(db_path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def query_patterns(pattern: Optional[str] = None, min_confidence: Optional[float] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   file: Optional[str] = None, history: bool = False,
+                   db_path: Optional[str] = None) -> List[Dict]:
+    """
+    Query stored pattern detections
+
+    Only the latest analysis of each file is considered unless history is
+    requested.
+
+    Args:
+        pattern: Pattern name to match (case-insensitive)
+        min_confidence: Minimum pattern confidence between 0 and 1
+        since: Only results analyzed on or after this ISO date
+        until: Only results analyzed on or before this ISO date
+        file: Only results whose path contains this substring
+        history: Also match earlier analyses of each file
+        db_path: Database path, defaults to DB_PATH
+
+    Returns:
+        Matching rows as dictionaries
+    """
+    clauses, params = [], []
+    if not history:
+        clauses.append(
+            "p.analyzed_at = (SELECT MAX(q.analyzed_at) FROM patterns q WHERE q.file = p.file)"
+        )
+    if pattern:
+        clauses.append("p.pattern_name = ?")
+        params.append(pattern)
+    if min_confidence is not None:
+        clauses.append("p.confidence >= ?")
+        params.append(min_confidence)
+    clauses, params = _common_filters('p', clauses, params, since, until, file)
+
+    sql = ("SELECT p.file, p.pattern_name, p.confidence, p.commit_sha, p.analyzed_at"
+           " FROM patterns p")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY p.pattern_name, p.file"
+
+    conn = connect(db_path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def latest_function_result(filepath: str, function: str,
+                           db_path: Optional[str] = None) -> Optional[Dict]:
+    """
+    Most recent stored complexity result for one function
+
+    Args:
+        filepath: Path of the analyzed file
+        function: Function name
+        db_path: Database path, defaults to DB_PATH
+
+    Returns:
+        The stored analyze_complexity_with_gemini entry, or None
+    """
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT result FROM functions WHERE file = ? AND function = ?"
+            " ORDER BY analyzed_at DESC LIMIT 1",
+            (str(Path(filepath).resolve()), function)
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row['result']) if row else None
+
+
+def record_latencies(samples: Sequence[float], db_path: Optional[str] = None):
+    """
+    Persist the latencies of successful model calls, keeping the newest samples
+
+    Args:
+        samples: Durations of the calls, in seconds
+        db_path: Database path, defaults to DB_PATH
+    """
+    if not samples:
+        return
+    recorded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    with connect(db_path) as conn:
+        conn.executemany("INSERT INTO latencies (seconds, recorded_at) VALUES (?, ?)",
+                         [(seconds, recorded_at) for seconds in samples])
+        newest = conn.execute("SELECT MAX(id) FROM latencies").fetchone()[0]
+        conn.execute("DELETE FROM latencies WHERE id <= ?", (newest - LATENCY_HISTORY,))
+    conn.close()
+
+
+def recent_latencies(limit: int = 200, db_path: Optional[str] = None) -> List[float]:
+    """
+    Latencies of the most recent model calls, across runs
+
+    Args:
+        limit: Maximum number of samples
+        db_path: Database path, defaults to DB_PATH
+
+    Returns:
+        Latencies in seconds, oldest first (none if the store does not exist yet)
+    """
+    if not os.path.exists(db_path or DB_PATH):
+        return []
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("SELECT seconds FROM latencies ORDER BY id DESC LIMIT ?",
+                            (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [row['seconds'] for row in reversed(rows)]
@@ -0,0 +1,327 @@
+"""
+Sandboxed Trial Runner
+Runs empirical measurement trials of user functions in isolated worker
+processes with CPU, memory and wall-clock limits, growing n adaptively
+"""
+
+import math
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait as wait_connections
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # No rlimits on Windows; the wall-clock limit still applies
+    resource = None
+
+from hotspot_profiler import (
+    MAX_POLYNOMIAL_EXPONENT,
+    MIN_FIT_SIZES,
+    TrialBudgetExceeded,
+    count_lines,
+    fit_base,
+    fit_exponent,
+    load_function
+)
+from input_synthesis import build_inputs, plan_for_code
+
+TRIAL_SECONDS = float(os.getenv('CODE_SENSEI_TRIAL_SECONDS', '5'))
+TRIAL_MEMORY_MB = int(os.getenv('CODE_SENSEI_TRIAL_MEMORY_MB', '1024'))
+TRIAL_WORKERS = int(os.getenv('CODE_SENSEI_TRIAL_WORKERS', '0')) or os.cpu_count() or 1
+MEASURE_SECONDS = float(os.getenv('CODE_SENSEI_MEASURE_SECONDS', '60'))
+
+START_SIZE = 8
+MAX_SIZE = 2 ** 16
+STABLE_TOLERANCE = 0.1
+MIN_TIMED_SECONDS = 0.02
+MAX_REPEAT_SECONDS = 0.5
+MIN_STABLE_SECONDS = 0.001
+
+_RESOURCE_FAILURES = {'timeout', 'predicted', 'killed', 'memory', 'recursion'}
+
+# Candidate growth models for classifying measurements, as log g(n)
+_GROWTH_MODELS = [
+    ('O(1)', lambda n: 0.0),
+    ('O(log n)', lambda n: math.log(math.log2(n) + 1)),
+    ('O(sqrt n)', lambda n: 0.5 * math.log(n)),
+    ('O(n)', math.log),
+    ('O(n log n)', lambda n: math.log(n) + math.log(math.log2(n) + 1)),
+    ('O(n^2)', lambda n: 2 * math.log(n)),
+    ('O(n^3+)', lambda n: 3 * math.log(n)),
+]
+
+# Fork keeps trials cheap to start and never re-imports the CLI in the worker
+_CONTEXT = multiprocessing.get_context(
+    'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def _limit_resources(seconds: float, memory_mb: int):
+    """Cap CPU time and heap size of the current (worker) process"""
+    if resource is None:
+        return
+    cpu = math.ceil(seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _trial_main(conn, code: str, filename: str, name: str, plan: list, n: int, mode: str,
+                seconds: float, memory_mb: int):
+    """Worker process entry point: run one trial and send back its result"""
+    _limit_resources(seconds, memory_mb)
+    sys.stdout = sys.stderr = open(os.devnull, 'w', encoding='utf-8')
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+    result = {'n': n}
+    try:
+        func = load_function(code, name, filename)
+        if mode == 'lines':
+            args, kwargs = build_inputs(plan, n)
+            started = time.perf_counter()
+            result['lines'] = dict(count_lines(func, args, kwargs, seconds))
+            result['seconds'] = time.perf_counter() - started
+        else:
+            # Fast calls are repeated on fresh inputs so timer resolution does not dominate
+            calls, total, began = 0, 0.0, time.perf_counter()
+            while not calls or (total < MIN_TIMED_SECONDS
+                                and time.perf_counter() - began < MAX_REPEAT_SECONDS):
+                args, kwargs = build_inputs(plan, n, seed=calls)
+                started = time.perf_counter()
+                func(*args, **kwargs)
+                total += time.perf_counter() - started
+                calls += 1
+            result['seconds'] = total / calls
+    except TrialBudgetExceeded:
+        result['failure'] = 'timeout'
+    except MemoryError:
+        result['failure'] = 'memory'
+    except RecursionError:
+        result['failure'] = 'recursion'
+    except Exception as e:
+        result['failure'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    conn.send(result)
+    conn.close()
+
+
+def _predict_seconds(sizes: List[int], seconds: List[float], n: int) -> Optional[float]:
+    """Extrapolate the running time at n from the largest measured sizes"""
+    if len(sizes) < 2:
+        return None
+    window_sizes, window_seconds = sizes[-MIN_FIT_SIZES:], seconds[-MIN_FIT_SIZES:]
+    exponent = fit_exponent(window_sizes, window_seconds)
+    if exponent > MAX_POLYNOMIAL_EXPONENT:
+        growth = (n - sizes[-1]) * math.log(fit_base(window_sizes, window_seconds))
+    else:
+        growth = max(exponent, 0.0) * math.log(n / sizes[-1])
+    return seconds[-1] * math.exp(min(growth, 700.0))
+
+
+def classify_growth(sizes: Sequence[int], values: Sequence[float]) -> Optional[str]:
+    """
+    Pick the complexity class whose growth best matches measurements
+
+    Args:
+        sizes: Input sizes
+        values: Time or operation count at each size
+
+    Returns:
+        A label from result_store.COMPLEXITY_CLASSES, or None with too few points
+    """
+    points = [(n, v) for n, v in zip(sizes, values) if n > 1 and v > 0][-4:]
+    if len(points) < 2:
+        return None
+    if fit_exponent(*zip(*points)) > MAX_POLYNOMIAL_EXPONENT:
+        return 'O(2^n)'
+    best, best_error = None, None
+    for label, log_growth in _GROWTH_MODELS:
+        # Residual spread of log(value / g(n)); the constant factor drops out
+        residuals = [math.log(v) - log_growth(n) for n, v in points]
+        mean = sum(residuals) / len(residuals)
+        error = sum((r - mean) ** 2 for r in residuals)
+        if best_error is None or error < best_error:
+            best, best_error = label, error
+    return best
+
+
+def measure(code: str, name: str, filename: str = '<code-sensei>',
+            sizes: Optional[Sequence[int]] = None, mode: str = 'time',
+            workers: Optional[int] = None, trial_seconds: Optional[float] = None,
+            memory_mb: Optional[int] = None, max_seconds: Optional[float] = None) -> Dict:
+    """
+    Measure a function at growing input sizes in sandboxed worker processes
+
+    Each trial runs in its own process with CPU, memory and wall-clock
+    limits, and up to `workers` trials run at once. Without explicit sizes, n
+    doubles from START_SIZE until the fitted growth exponent is stable. A
+    trial whose extrapolated time exceeds the limit is killed (or never
+    started), so exponential functions end quickly; if that leaves too few
+    sizes for a fit, sizes between the last good one and the failed one are
+    tried.
+
+    Args:
+        code: Module source containing the function
+        name: Module-level function to measure
+        filename: Filename used for tracebacks and source lookup
+        sizes: Explicit input sizes, instead of the adaptive schedule
+        mode: 'time' for wall-clock time per call, 'lines' for per-line hit counts
+        workers: Concurrent trial processes, defaults to TRIAL_WORKERS
+        trial_seconds: Wall-clock limit per trial, defaults to TRIAL_SECONDS
+        memory_mb: Heap limit per trial, defaults to TRIAL_MEMORY_MB
+        max_seconds: Limit for the whole measurement, defaults to MEASURE_SECONDS
+
+    Returns:
+        Dictionary with the measured 'sizes', 'seconds' per call, 'lines'
+        (per-size hit counts in lines mode), 'exponent', 'complexity',
+        'stopped_at', the stop 'reason' and trial 'errors'
+
+    Raises:
+        KeyError: If the code defines no such function
+    """
+    plan = plan_for_code(code, name)
+    if plan is None:
+        raise KeyError(f"Function '{name}' not found")
+    workers = workers or TRIAL_WORKERS
+    trial_seconds = trial_seconds or TRIAL_SECONDS
+    memory_mb = TRIAL_MEMORY_MB if memory_mb is None else memory_mb
+    deadline = time.monotonic() + (max_seconds or MEASURE_SECONDS)
+
+    schedule = sorted(set(sizes)) if sizes else [START_SIZE]
+    scheduled = set()
+    completed: Dict[int, Dict] = {}
+    errors: Dict[int, str] = {}
+    running: Dict[object, tuple] = {}
+    state = {'ceiling': math.inf, 'reason': None, 'failure': None, 'fits': []}
+
+    def prefix() -> List[int]:
+        """Completed sizes below every unfinished or failed one"""
+        blocked = min([n for _, n, _ in running.values()] + [state['ceiling']])
+        return sorted(n for n in completed if n < blocked)
+
+    def metric(n: int) -> float:
+        result = completed[n]
+        return sum(result['lines'].values()) if mode == 'lines' else result['seconds']
+
+    def predicted(n: int) -> Optional[float]:
+        done = prefix()
+        return _predict_seconds(done, [completed[m]['seconds'] for m in done], n)
+
+    def next_size() -> Optional[int]:
+        while schedule:
+            n = schedule.pop(0)
+            if n not in scheduled and n < state['ceiling']:
+                return n
+        if not sizes and scheduled:
+            n = max(scheduled) * 2
+            if n <= MAX_SIZE and n < state['ceiling']:
+                return n
+        return None
+
+    def stop(process, conn):
+        process.kill()
+        process.join()
+        conn.close()
+        del running[conn]
+
+    def fail(n: int, reason: str):
+        errors.setdefault(n, reason)
+        state['failure'] = state['failure'] or reason.split(':')[0]
+        state['ceiling'] = min(state['ceiling'], n)
+        for conn, (process, other, _) in list(running.items()):
+            if other >= state['ceiling']:
+                stop(process, conn)
+        # Too few points for a fit: narrow in between the last good size and this one.
+        # Errors raised by the function itself will not go away at a smaller n.
+        done = [m for m in completed if m < n]
+        if reason in _RESOURCE_FAILURES and done and len(done) < MIN_FIT_SIZES:
+            middle = (max(done) + n) // 2
+            if middle > max(done) and middle not in scheduled:
+                schedule.insert(0, middle)
+
+    def check_stable():
+        done = prefix()
+        if len(done) < MIN_FIT_SIZES:
+            return
+        window = done[-MIN_FIT_SIZES:]
+        exponent = fit_exponent(window, [metric(n) for n in window])
+        if not state['fits'] or state['fits'][-1][0] != window[-1]:
+            state['fits'].append((window[-1], exponent))
+        long_enough = mode == 'lines' or completed[done[-1]]['seconds'] >= MIN_STABLE_SECONDS
+        if (not sizes and long_enough and len(state['fits']) >= 2
+                and abs(state['fits'][-1][1] - state['fits'][-2][1]) <= STABLE_TOLERANCE):
+            state['reason'] = 'stable'
+            for conn, (process, _, _) in list(running.items()):
+                stop(process, conn)
+
+    try:
+        while state['reason'] is None:
+            while len(running) < workers:
+                n = next_size()
+                if n is None:
+                    break
+                scheduled.add(n)
+                estimate = predicted(n)
+                if estimate is not None and estimate > trial_seconds:
+                    fail(n, 'predicted')
+                    continue
+                receiver, sender = _CONTEXT.Pipe(duplex=False)
+                process = _CONTEXT.Process(target=_trial_main, daemon=True,
+                                           args=(sender, code, filename, name, plan, n, mode,
+                                                 trial_seconds, memory_mb))
+                process.start()
+                sender.close()
+                running[receiver] = (process, n, time.monotonic())
+            if not running:
+                break
+
+            for conn in wait_connections(list(running), timeout=0.05):
+                if conn not in running:
+                    continue
+                process, n, _ = running[conn]
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    # Killed by its CPU or memory rlimit before it could report
+                    result = {'n': n, 'failure': 'killed'}
+                stop(process, conn)
+                if 'failure' in result:
+                    fail(n, result.get('error') or result['failure'])
+                else:
+                    completed[n] = result
+                    check_stable()
+
+            now = time.monotonic()
+            for conn, (process, n, started) in list(running.items()):
+                if conn not in running:
+                    continue
+                if now - started > trial_seconds:
+                    stop(process, conn)
+                    fail(n, 'timeout')
+                elif (predicted(n) or 0) > trial_seconds:
+                    stop(process, conn)
+                    fail(n, 'predicted')
+            if now > deadline:
+                state['reason'] = 'budget'
+    finally:
+        for conn, (process, _, _) in list(running.items()):
+            stop(process, conn)
+
+    done = prefix()
+    values = [metric(n) for n in done]
+    window = done[-MIN_FIT_SIZES:]
+    exponent = fit_exponent(window, values[-MIN_FIT_SIZES:]) if len(window) >= 2 else None
+    return {
+        'function': name,
+        'mode': mode,
+        'sizes': done,
+        'seconds': [completed[n]['seconds'] for n in done],
+        'lines': [completed[n]['lines'] for n in done] if mode == 'lines' else None,
+        'exponent': exponent,
+        'complexity': classify_growth(done, values),
+        'stopped_at': min(errors) if errors else None,
+        'reason': state['reason'] or state['failure'] or 'exhausted',
+        'errors': errors,
+    }
@@ -0,0 +1,263 @@
+"""
+Streaming Scan Pipeline
+Analyzes whole directory trees as a walk -> read -> minimize -> analyze -> emit
+pipeline with bounded queues and resumable checkpoints
+"""
+
+import ast
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from result_store import code_fingerprint
+
+CHECKPOINT_PATH = os.getenv('CODE_SENSEI_CHECKPOINT', '.code_sensei_checkpoint.jsonl')
+QUEUE_SIZE = int(os.getenv('CODE_SENSEI_QUEUE_SIZE', '32'))
+
+SKIPPED_DIRS = {'__pycache__', 'node_modules', 'venv', 'env', 'build', 'dist', 'site-packages'}
+
+_DONE = object()
+
+
+def walk_python_files(root: str) -> Iterator[Path]:
+    """
+    Yield Python files under root in a stable order
+
+    Hidden directories, virtual environments and build output are skipped.
+
+    Args:
+        root: Directory (or single file) to walk
+
+    Yields:
+        Paths of .py files
+    """
+    root_path = Path(root)
+    if root_path.is_file():
+        yield root_path
+        return
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith('.') and d not in SKIPPED_DIRS)
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield Path(dirpath) / filename
+
+
+def minimize_code(code: str) -> str:
+    """
+    Strip docstrings, comments and formatting to cut prompt size
+
+    Args:
+        code: The code to minimize
+
+    Returns:
+        The minimized code, or the original if it does not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if (body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+                    and isinstance(body[0].value.value, str)):
+                node.body = body[1:] or [ast.Pass()]
+    return ast.unparse(tree)
+
+
+def load_checkpoint(checkpoint_path: str) -> Set[tuple]:
+    """
+    Read the (file, fingerprint) pairs already finished by earlier runs
+
+    Args:
+        checkpoint_path: Path of the JSON-lines checkpoint file
+
+    Returns:
+        Set of (resolved file path, code fingerprint) pairs
+    """
+    finished = set()
+    if not os.path.exists(checkpoint_path):
+        return finished
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; the file is simply re-analyzed
+                continue
+            finished.add((entry['file'], entry['fingerprint']))
+    return finished
+
+
+def _put(target: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put into a bounded queue, giving up if the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source: queue.Queue, stop: threading.Event):
+    """Get from a queue, returning _DONE if the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def scan_tree(root: str, analyze: Callable[[Dict], Dict], emit: Callable[[Dict, Dict], None],
+              workers: int = 4, queue_size: Optional[int] = None,
+              checkpoint_path: Optional[str] = None, resume: bool = True) -> Dict[str, int]:
+    """
+    Stream every Python file under root through the analysis pipeline
+
+    Each stage runs in its own thread and hands items to the next through a
+    bounded queue, so memory stays flat regardless of repository size. Every
+    emitted file is appended to the checkpoint; an interrupted run resumes
+    without re-querying files that were already finished.
+
+    Args:
+        root: Directory to scan
+        analyze: Called with an item ('path', 'code', 'minimized',
+            'fingerprint') and returns a result dictionary
+        emit: Called with each item and its result, in the main thread
+        workers: Number of concurrent analyze workers
+        queue_size: Capacity of each inter-stage queue
+        checkpoint_path: JSON-lines checkpoint file, defaults to CHECKPOINT_PATH
+        resume: Skip files recorded in the checkpoint; otherwise start over
+
+    Returns:
+        Counts of 'analyzed', 'skipped' and 'failed' files
+
+    Raises:
+        ValueError: If workers or queue_size is less than 1
+    """
+    queue_size = QUEUE_SIZE if queue_size is None else queue_size
+    if workers < 1 or queue_size < 1:
+        raise ValueError("workers and queue_size must be at least 1")
+    checkpoint_path = checkpoint_path or CHECKPOINT_PATH
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    finished = load_checkpoint(checkpoint_path)
+
+    stop = threading.Event()
+    paths: queue.Queue = queue.Queue(maxsize=queue_size)
+    sources: queue.Queue = queue.Queue(maxsize=queue_size)
+    work: queue.Queue = queue.Queue(maxsize=queue_size)
+    results: queue.Queue = queue.Queue(maxsize=queue_size)
+    stats = {'analyzed': 0, 'skipped': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def walk_stage():
+        try:
+            for path in walk_python_files(root):
+                if not _put(paths, path, stop):
+                    return
+        finally:
+            _put(paths, _DONE, stop)
+
+    def fail(item: Dict, message: str) -> bool:
+        item['error'] = message
+        return _put(results, (item, None), stop)
+
+    def read_stage():
+        try:
+            while True:
+                path = _get(paths, stop)
+                if path is _DONE:
+                    break
+                item = {'path': str(path.resolve())}
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        item['code'] = f.read()
+                    item['fingerprint'] = code_fingerprint(item['code'])
+                except (OSError, UnicodeDecodeError) as e:
+                    if not fail(item, f"Error reading file: {e}"):
+                        return
+                    continue
+                except Exception as e:
+                    # e.g. RecursionError on pathologically deep expressions
+                    if not fail(item, f"Error fingerprinting file: {e!r}"):
+                        return
+                    continue
+                if (item['path'], item['fingerprint']) in finished:
+                    with lock:
+                        stats['skipped'] += 1
+                    continue
+                if not _put(sources, item, stop):
+                    return
+        finally:
+            _put(sources, _DONE, stop)
+
+    def minimize_stage():
+        try:
+            while True:
+                item = _get(sources, stop)
+                if item is _DONE:
+                    break
+                try:
+                    item['minimized'] = minimize_code(item['code'])
+                except Exception as e:
+                    if not fail(item, f"Error minimizing file: {e!r}"):
+                        return
+                    continue
+                if not _put(work, item, stop):
+                    return
+        finally:
+            for _ in range(workers):
+                _put(work, _DONE, stop)
+
+    def analyze_stage():
+        try:
+            while True:
+                item = _get(work, stop)
+                if item is _DONE:
+                    break
+                try:
+                    result = analyze(item)
+                except Exception as e:
+                    item['error'] = f"Analysis failed: {e}"
+                    result = None
+                if not _put(results, (item, result), stop):
+                    return
+        finally:
+            _put(results, (_DONE, None), stop)
+
+    threads = [threading.Thread(target=walk_stage, daemon=True),
+               threading.Thread(target=read_stage, daemon=True),
+               threading.Thread(target=minimize_stage, daemon=True)]
+    threads += [threading.Thread(target=analyze_stage, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    # Emit stage runs in the caller's thread so output is never interleaved
+    remaining_workers = workers
+    try:
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            while remaining_workers:
+                item, result = _get(results, stop)
+                if item is _DONE:
+                    remaining_workers -= 1
+                    continue
+                emit(item, result)
+                if 'error' in item or not result:
+                    stats['failed'] += 1
+                    continue
+                stats['analyzed'] += 1
+                checkpoint.write(json.dumps({'file': item['path'],
+                                             'fingerprint': item['fingerprint']}) + '\n')
+                checkpoint.flush()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=1)
+    return stats